@@ -1,17 +1,34 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from database import User, get_db
-from config import SECRET_KEY
+from config import SECRET_KEY, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, USER_CACHE_SIZE, USER_CACHE_TTL
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 
 # Configuration
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Calendar feed tokens go in subscription URLs and only grant read access to the feed
+FEED_TOKEN_SCOPE = "feed"
+FEED_TOKEN_EXPIRE_DAYS = 365
+
+# Event stream tokens go in EventSource URLs, which access logs record, so they only
+# open the stream and expire soon; an open stream outlives its token
+STREAM_TOKEN_SCOPE = "stream"
+STREAM_TOKEN_EXPIRE_MINUTES = 5
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -26,10 +43,168 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded worker pool.
+    
+    bcrypt is deliberately slow, so hashing is kept off the event loop and out
+    of the request threadpool. At most `workers` hashes run at once and up to
+    `max_queue` more wait; beyond that requests are rejected with 503.
+    """
+    
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+    
+    def _timed(self, submitted: float, func, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            wait = started - submitted
+            self._wait_seconds += wait
+            self._max_wait_seconds = max(self._max_wait_seconds, wait)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+    
+    async def run(self, func, *args):
+        """Run a hashing function on the pool and await its result."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent login attempts, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        try:
+            future = self._executor.submit(self._timed, time.perf_counter(), func, *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    def stats(self) -> dict:
+        """Snapshot of pool usage and queueing."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_seconds_total": self._wait_seconds,
+                "wait_seconds_max": self._max_wait_seconds,
+            }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password hashing pool."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password hashing pool."""
+    return await password_hasher.run(get_password_hash, password)
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of the authenticated user, safe to share between requests."""
+    id: int
+    username: str
+    is_active: bool
+
+class UserCache:
+    """In-process LRU cache of users by username, with a time-to-live.
+    
+    Entries are invalidated when a User row is updated or deleted through the
+    ORM in this process; the TTL bounds staleness for changes made elsewhere
+    (other workers, the create_user scripts).
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, username: str) -> Optional[CurrentUser]:
+        """Return a cached user, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, user: CurrentUser):
+        """Cache a user, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user.username] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, username: str):
+        """Drop a user from the cache."""
+        with self._lock:
+            self._entries.pop(username, None)
+    
+    def clear(self):
+        """Drop all cached users."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        """Cache size and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """Evict users changed through the ORM, including a previous username."""
+    user_cache.invalidate(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted:
+        user_cache.invalidate(old_username)
+
+def get_user(db: Session, username: str) -> Optional[User]:
+    """Look up a user by username."""
+    return db.query(User).filter(User.username == username).first()
+
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """Authenticate a user by username and password."""
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = await run_in_threadpool(get_user, db, username)
+    if not user or not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
@@ -44,8 +219,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get the current authenticated user from JWT token."""
+def create_feed_token(username: str) -> str:
+    """Create a long-lived JWT that only authenticates the user's calendar feed."""
+    return create_access_token(
+        data={"sub": username, "scope": FEED_TOKEN_SCOPE},
+        expires_delta=timedelta(days=FEED_TOKEN_EXPIRE_DAYS)
+    )
+
+def create_stream_token(username: str) -> str:
+    """Create a short-lived JWT that only authenticates the user's event stream."""
+    return create_access_token(
+        data={"sub": username, "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(minutes=STREAM_TOKEN_EXPIRE_MINUTES)
+    )
+
+def _user_from_token(token: str, db: Session, scope: Optional[str]) -> CurrentUser:
+    """Resolve a JWT with the given scope to a user, served from the user cache when possible."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,17 +243,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    cached_user = user_cache.get(username)
+    if cached_user is not None:
+        return cached_user
+    
+    user = get_user(db, username)
     if user is None:
         raise credentials_exception
-    return user
+    current_user = CurrentUser(id=user.id, username=user.username, is_active=bool(user.is_active))
+    user_cache.put(current_user)
+    return current_user
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    """Get the current authenticated user from JWT token, served from the user cache when possible."""
+    return _user_from_token(token, db, None)
+
+def get_feed_user(token: str, db: Session = Depends(get_db)) -> CurrentUser:
+    """Get the active user of a calendar feed from the token query parameter."""
+    current_user = _user_from_token(token, db, FEED_TOKEN_SCOPE)
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+def get_stream_user(token: str, db: Session = Depends(get_db)) -> CurrentUser:
+    """Get the active user of an event stream from the stream token query parameter, as EventSource can't send headers."""
+    current_user = _user_from_token(token, db, STREAM_TOKEN_SCOPE)
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
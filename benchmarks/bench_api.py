@@ -0,0 +1,114 @@
+"""
+Benchmarks of the event API against a seeded database.
+
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks --benchmark-autosave                  # record a run
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:15%
+
+Each benchmark issues one request through the ASGI app, including auth,
+routing and serialization. See conftest.py for the dataset settings.
+"""
+
+import itertools
+from datetime import datetime, timezone
+
+from cache import invalidate_months
+from pagination import encode_cursor
+from seed import SEED_YEAR
+
+_ids = itertools.count()
+
+def _get(client, path, headers):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+def test_get_month_uncached(benchmark, client, auth_headers, bench_user_id):
+    path = f"/api/events?month={SEED_YEAR}-06"
+    benchmark.pedantic(
+        _get,
+        args=(client, path, auth_headers),
+        setup=lambda: invalidate_months(bench_user_id, [f"{SEED_YEAR}-06"]),
+        rounds=50,
+        iterations=1,
+    )
+
+def test_get_month_cached(benchmark, client, auth_headers):
+    path = f"/api/events?month={SEED_YEAR}-06"
+    _get(client, path, auth_headers)
+    benchmark(_get, client, path, auth_headers)
+
+def test_get_year_range(benchmark, client, auth_headers):
+    path = f"/api/events?start={SEED_YEAR}-01-01&end={SEED_YEAR + 1}-01-01"
+    benchmark.pedantic(_get, args=(client, path, auth_headers), rounds=10, iterations=1)
+
+def test_get_year_summary(benchmark, client, auth_headers):
+    path = f"/api/events/summary?start={SEED_YEAR}-01-01&end={SEED_YEAR + 1}-01-01&granularity=day"
+    benchmark.pedantic(_get, args=(client, path, auth_headers), rounds=20, iterations=1)
+
+def test_get_all_events(benchmark, client, auth_headers):
+    benchmark.pedantic(_get, args=(client, "/api/events", auth_headers), rounds=10, iterations=1)
+
+def test_get_page_first(benchmark, client, auth_headers):
+    benchmark(_get, client, "/api/events?limit=100", auth_headers)
+
+def test_get_page_deep(benchmark, client, auth_headers):
+    # A page in December costs the same as the first one: the cursor is an index seek, not an offset
+    cursor = encode_cursor((datetime(SEED_YEAR, 12, 1, tzinfo=timezone.utc), ""))
+    benchmark(_get, client, f"/api/events?limit=100&cursor={cursor}", auth_headers)
+
+def test_search_selective(benchmark, client, auth_headers):
+    benchmark(_get, client, "/api/events/search?q=event 4242&limit=20", auth_headers)
+
+def test_search_broad(benchmark, client, auth_headers):
+    # Every seeded title contains "event": ranks and sorts all of the user's events
+    benchmark(_get, client, "/api/events/search?q=event&limit=20", auth_headers)
+
+def test_get_date(benchmark, client, auth_headers):
+    benchmark(_get, client, f"/api/events/{SEED_YEAR}-06-15", auth_headers)
+
+def _create_series(client, headers, event_id, recurrence_types):
+    response = client.post(
+        f"/api/events/{SEED_YEAR}-03-01",
+        json={"id": event_id, "title": "Benchmark series", "date": f"{SEED_YEAR}-03-01T09:00:00Z", "recurrence_types": recurrence_types},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+def test_create_series(benchmark, client, auth_headers):
+    def setup():
+        return (client, auth_headers, f"bench-create-{next(_ids)}", ["daily", "weekly"]), {}
+
+    benchmark.pedantic(_create_series, setup=setup, rounds=50, iterations=1)
+    client.delete("/api/events?title=Benchmark series", headers=auth_headers)
+
+def _delete_group(client, headers, event_id):
+    response = client.delete(f"/api/events/{SEED_YEAR}-03-01/{event_id}?delete_all=true", headers=headers)
+    assert response.status_code == 200, response.text
+
+def test_delete_group(benchmark, client, auth_headers):
+    def setup():
+        series_id = f"bench-delete-{next(_ids)}"
+        _create_series(client, auth_headers, series_id, ["daily"])
+        # Detach one occurrence so the group also has a stored row to delete
+        client.put(f"/api/events/{SEED_YEAR}-03-02/{series_id}_{SEED_YEAR}0302", json={"title": "Detached"}, headers=auth_headers)
+        return (client, auth_headers, f"{series_id}_{SEED_YEAR}0303"), {}
+
+    benchmark.pedantic(_delete_group, setup=setup, rounds=50, iterations=1)
+
+def _batch(client, headers, operations):
+    response = client.post("/api/events/batch", json={"operations": operations}, headers=headers)
+    assert response.status_code == 200, response.text
+
+def test_batch_create_100(benchmark, client, auth_headers):
+    # 100 creates in one request and one commit, compare with 100 POST /api/events/{date} calls
+    def setup():
+        batch = next(_ids)
+        operations = [
+            {"op": "create", "event": {"id": f"bench-batch-{batch}-{number}", "title": "Benchmark batch", "date": f"{SEED_YEAR}-04-{number % 28 + 1:02d}T09:00:00Z"}}
+            for number in range(100)
+        ]
+        return (client, auth_headers, operations), {}
+
+    benchmark.pedantic(_batch, setup=setup, rounds=20, iterations=1)
+    client.delete("/api/events?title=Benchmark batch", headers=auth_headers)
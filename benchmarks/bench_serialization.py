@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark event listing serialization.
+
+Seeds a user with N stored events and times reading them back into a JSON
+body two ways, reporting the median time of each phase and the peak memory
+of the whole pipeline:
+
+  orm       ORM objects, Event.to_dict(), jsonable_encoder, json.dumps
+            (what GET /api/events used to do)
+  columns   column-only select, event_dict(), serialization.dumps
+            (the current FastJSONResponse path)
+
+    python benchmarks/bench_serialization.py --database-url sqlite:////tmp/bench.db --sizes 10000 100000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import sessionmaker
+
+from bench_series_create import bench_user
+from database import Base, Event, EVENT_COLUMNS, event_dict, insert_events
+from serialization import dumps, orjson
+
+def seed(db, user_id, size):
+    """Give the benchmark user exactly size stored events"""
+    if db.scalar(select(func.count()).select_from(Event).where(Event.user_id == user_id)) == size:
+        return
+    db.execute(delete(Event).where(Event.user_id == user_id))
+    start = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+    insert_events(db, [
+        {
+            "event_id": f"bench-serialization-{index}",
+            "user_id": user_id,
+            "title": f"Benchmark event {index}",
+            "date": start + timedelta(minutes=5 * index),
+            "recurrence_type": None,
+            "recurrence_group_id": None,
+        }
+        for index in range(size)
+    ])
+    db.commit()
+
+def load_orm(db, user_id):
+    events = db.query(Event).filter(Event.user_id == user_id).order_by(Event.date).all()
+    return [event.to_dict() for event in events]
+
+def encode_orm(items):
+    # Same arguments as fastapi.responses.JSONResponse.render
+    return json.dumps(jsonable_encoder(items), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def load_columns(db, user_id):
+    rows = db.execute(select(*EVENT_COLUMNS).where(Event.user_id == user_id).order_by(Event.date))
+    return [event_dict(row) for row in rows]
+
+STRATEGIES = [("orm", load_orm, encode_orm), ("columns", load_columns, dumps)]
+
+def measure(Session, user_id, load, encode, repeat):
+    """Median load and encode times, and the peak memory of one full run"""
+    load_times, encode_times = [], []
+    for _ in range(repeat):
+        with Session() as db:
+            started = time.perf_counter()
+            items = load(db, user_id)
+            loaded = time.perf_counter()
+            body = encode(items)
+            load_times.append(loaded - started)
+            encode_times.append(time.perf_counter() - loaded)
+
+    with Session() as db:
+        tracemalloc.start()
+        body = encode(load(db, user_id))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return statistics.median(load_times), statistics.median(encode_times), peak, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event listing serialization")
+    parser.add_argument("--database-url", default="sqlite:////tmp/bench_serialization.db")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        user_id = bench_user(db)
+
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+    print(f"{'events':>7} {'path':<8} {'load':>10} {'encode':>10} {'total':>10} {'peak mem':>10} {'body':>9}")
+    for size in args.sizes:
+        with Session() as db:
+            seed(db, user_id, size)
+        for name, load, encode in STRATEGIES:
+            load_time, encode_time, peak, body_size = measure(Session, user_id, load, encode, args.repeat)
+            print(
+                f"{size:>7} {name:<8} {load_time * 1000:>7.1f} ms {encode_time * 1000:>7.1f} ms "
+                f"{(load_time + encode_time) * 1000:>7.1f} ms {peak / 2**20:>7.1f} MB {body_size / 2**20:>6.1f} MB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark recurring series creation.
+
+For each recurrence type, creates a one-year series three ways and reports
+the median latency:
+
+  per-row   one ORM add per occurrence, then a refresh per row (the old path)
+  bulk      all occurrences with multi-row INSERT ... RETURNING
+  series    a single recurrence_series row (what POST /api/events does)
+
+    python benchmarks/bench_series_create.py --database-url sqlite:////tmp/bench.db
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Event, RecurrenceSeries, User, insert_events
+from recurrence import DEFAULT_SPAN, expand
+
+def bench_user(db):
+    """Get or create the user owning the benchmark events"""
+    user = db.query(User).filter(User.username == "bench").first()
+    if not user:
+        user = User(username="bench", hashed_password="!")
+        db.add(user)
+        db.commit()
+    return user.id
+
+def occurrence_rows(recurrence_type, anchor, series_id, user_id):
+    """Materialized rows for a one-year series, as the old create_event built them"""
+    return [
+        {
+            "event_id": f"{series_id}_{occurrence.strftime('%Y%m%d')}",
+            "user_id": user_id,
+            "title": f"Benchmark {recurrence_type}",
+            "date": occurrence,
+            "recurrence_type": recurrence_type,
+            "recurrence_group_id": series_id,
+        }
+        for occurrence, _ in expand(anchor, [recurrence_type], until=anchor + DEFAULT_SPAN)
+    ]
+
+def create_per_row(db, user_id, recurrence_type, anchor, series_id):
+    created = [Event(**row) for row in occurrence_rows(recurrence_type, anchor, series_id, user_id)]
+    db.add_all(created)
+    db.commit()
+    for event in created:
+        db.refresh(event)
+    return len(created)
+
+def create_bulk(db, user_id, recurrence_type, anchor, series_id):
+    created = insert_events(db, occurrence_rows(recurrence_type, anchor, series_id, user_id))
+    db.commit()
+    return len(created)
+
+def create_series(db, user_id, recurrence_type, anchor, series_id):
+    db.add(RecurrenceSeries(
+        series_id=series_id,
+        user_id=user_id,
+        title=f"Benchmark {recurrence_type}",
+        anchor=anchor,
+        recurrence_types=recurrence_type,
+        until=anchor + DEFAULT_SPAN,
+        exceptions=[],
+    ))
+    db.commit()
+    return sum(1 for _ in expand(anchor, [recurrence_type], until=anchor + DEFAULT_SPAN))
+
+STRATEGIES = [("per-row", create_per_row), ("bulk", create_bulk), ("series", create_series)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recurring series creation")
+    parser.add_argument("--database-url", default="sqlite:////tmp/bench_series_create.db")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    anchor = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+    with Session() as db:
+        user_id = bench_user(db)
+
+    print(f"{'type':<10} {'rows':>5} " + " ".join(f"{name:>12}" for name, _ in STRATEGIES))
+    for recurrence_type in ("daily", "weekly", "monthly", "quarterly"):
+        medians = []
+        for name, strategy in STRATEGIES:
+            timings = []
+            for attempt in range(args.repeat):
+                series_id = f"bench-{name}-{recurrence_type}-{attempt}"
+                with Session() as db:
+                    started = time.perf_counter()
+                    rows = strategy(db, user_id, recurrence_type, anchor, series_id)
+                    timings.append(time.perf_counter() - started)
+                    db.execute(delete(Event).where(Event.recurrence_group_id == series_id))
+                    db.execute(delete(RecurrenceSeries).where(RecurrenceSeries.series_id == series_id))
+                    db.commit()
+            medians.append(statistics.median(timings))
+        print(f"{recurrence_type:<10} {rows:>5} " + " ".join(f"{m * 1000:>9.2f} ms" for m in medians))
+
+if __name__ == "__main__":
+    main()
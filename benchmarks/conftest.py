@@ -0,0 +1,64 @@
+"""
+Fixtures for the API benchmarks in bench_api.py.
+
+The app is pointed at BENCH_DATABASE_URL before it is imported, and the
+database is seeded once per session. The dataset size comes from
+BENCH_USERS, BENCH_EVENTS and BENCH_SERIES and is saved with each run,
+so saved results are only compared with runs over the same data.
+"""
+
+import os
+import sys
+
+import pytest
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL", "sqlite:////tmp/bench_api.db")
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATASET = {
+    "users": int(os.environ.get("BENCH_USERS", "3")),
+    "events": int(os.environ.get("BENCH_EVENTS", "10000")),
+    "series": int(os.environ.get("BENCH_SERIES", "30")),
+}
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_benchmark_update_machine_info(config, machine_info):
+    from sqlalchemy.engine import make_url
+
+    machine_info["dataset"] = dict(DATASET)
+    machine_info["database"] = make_url(BENCH_DATABASE_URL).get_backend_name()
+
+@pytest.fixture(scope="session")
+def seeded():
+    from database import SessionLocal, init_db
+    from seed import seed_database
+
+    init_db()
+    return seed_database(SessionLocal, DATASET["users"], DATASET["events"], DATASET["series"])
+
+@pytest.fixture(scope="session")
+def bench_user_id(seeded):
+    from database import SessionLocal, User
+    from seed import bench_username
+
+    with SessionLocal() as db:
+        return db.query(User.id).filter(User.username == bench_username(0)).scalar()
+
+@pytest.fixture(scope="session")
+def client(seeded):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    from seed import BENCH_PASSWORD, bench_username
+
+    response = client.post("/api/login", data={"username": bench_username(0), "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the calendar API.
+
+Logs in once, then fires requests at an endpoint from many concurrent
+clients and reports throughput and latency percentiles. Run it against the
+same database before and after a change to compare.
+
+    python benchmarks/loadtest.py --concurrency 50 --requests 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(int(len(values) * pct / 100), len(values) - 1)
+    return values[index]
+
+async def login(client, username, password):
+    """Get a bearer token for the load test user"""
+    response = await client.post("/api/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def worker(client, path, headers, remaining, latencies, errors):
+    """Issue requests until the shared budget is used up"""
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        remaining = [args.requests]
+        latencies = []
+        errors = []
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, args.path, headers, remaining, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Endpoint:     GET {args.path}")
+    print(f"Concurrency:  {args.concurrency}")
+    print(f"Requests:     {len(latencies)} in {elapsed:.2f}s ({len(errors)} errors)")
+    print(f"Throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"Latency mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 95, 99):
+        print(f"Latency p{pct}:  {percentile(latencies, pct) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the calendar API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--path", default="/api/events?month=2025-07")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
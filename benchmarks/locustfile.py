@@ -0,0 +1,62 @@
+"""
+Locust load profile for the event API.
+
+Simulated users log in as one of the seeded benchmark users (see seed.py)
+and mostly browse months, sometimes open a day or a whole year, and
+occasionally create a recurring series and delete it again.
+
+    python benchmarks/seed.py --database-url "$DATABASE_URL" --users 5
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 --users 50 --spawn-rate 10 --run-time 2m --headless
+
+BENCH_USERS must not exceed the number of seeded users.
+"""
+
+import itertools
+import os
+import random
+import uuid
+
+from locust import HttpUser, between, task
+
+BENCH_USERS = int(os.getenv("BENCH_USERS", "3"))
+BENCH_PASSWORD = "bench"
+SEED_YEAR = 2025
+
+_user_numbers = itertools.count()
+
+class CalendarUser(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        username = f"bench{next(_user_numbers) % BENCH_USERS}"
+        response = self.client.post("/api/login", data={"username": username, "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    @task(10)
+    def view_month(self):
+        month = random.randint(1, 12)
+        self.client.get(f"/api/events?month={SEED_YEAR}-{month:02d}", name="/api/events?month=[month]")
+
+    @task(4)
+    def view_date(self):
+        day = random.randint(1, 28)
+        month = random.randint(1, 12)
+        self.client.get(f"/api/events/{SEED_YEAR}-{month:02d}-{day:02d}", name="/api/events/[date]")
+
+    @task(1)
+    def view_year(self):
+        self.client.get(f"/api/events?start={SEED_YEAR}-01-01&end={SEED_YEAR + 1}-01-01", name="/api/events?start&end")
+
+    @task(1)
+    def create_and_delete_series(self):
+        event_id = f"locust-{uuid.uuid4().hex}"
+        self.client.post(
+            f"/api/events/{SEED_YEAR}-03-01",
+            json={"id": event_id, "title": "Load test series", "date": f"{SEED_YEAR}-03-01T09:00:00Z", "recurrence_types": ["weekly"]},
+            name="/api/events/[date] (create series)",
+        )
+        self.client.delete(
+            f"/api/events/{SEED_YEAR}-03-01/{event_id}_{SEED_YEAR}0301?delete_all=true",
+            name="/api/events/[date]/[id] (delete group)",
+        )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Seed a database with benchmark users, events and recurrence series.
+
+Users are named bench0, bench1, ... with password "bench". Existing data of
+those users is replaced, and the data is generated from a fixed random seed,
+so two runs with the same settings produce the same dataset.
+
+    python benchmarks/seed.py --database-url sqlite:////tmp/bench_api.db --users 5 --events 20000 --series 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from auth import get_password_hash
+from database import Base, Event, EventTombstone, RecurrenceSeries, User, insert_new_events
+from recurrence import DEFAULT_SPAN, RECURRENCE_TYPES
+
+BENCH_PASSWORD = "bench"
+SEED_YEAR = 2025
+
+def bench_username(index: int) -> str:
+    return f"bench{index}"
+
+def seed_database(Session, users: int = 3, events: int = 10000, series: int = 30, seed: int = 42) -> dict:
+    """Create or reset the benchmark users and give each one events and series in SEED_YEAR"""
+    rng = random.Random(seed)
+    year_start = datetime(SEED_YEAR, 1, 1, tzinfo=timezone.utc)
+    minutes_in_year = 365 * 24 * 60
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+
+    with Session() as db:
+        for index in range(users):
+            username = bench_username(index)
+            user = db.query(User).filter(User.username == username).first()
+            if user:
+                for model in (Event, RecurrenceSeries, EventTombstone):
+                    db.execute(delete(model).where(model.user_id == user.id))
+                user.events_version = 0
+            else:
+                user = User(username=username, hashed_password=hashed_password)
+                db.add(user)
+                db.flush()
+
+            insert_new_events(db, [
+                {
+                    "event_id": f"{username}-event-{number}",
+                    "user_id": user.id,
+                    "title": f"Event {number}",
+                    # Whole minutes, like events created in the UI
+                    "date": year_start + timedelta(minutes=rng.randrange(minutes_in_year)),
+                    "recurrence_type": None,
+                    "recurrence_group_id": None,
+                }
+                for number in range(events)
+            ])
+            series_rows = []
+            for number in range(series):
+                anchor = year_start + timedelta(minutes=rng.randrange(minutes_in_year))
+                series_rows.append({
+                    "series_id": f"{username}-series-{number}",
+                    "user_id": user.id,
+                    "title": f"Series {number}",
+                    "anchor": anchor,
+                    "recurrence_types": rng.choice(RECURRENCE_TYPES),
+                    "until": anchor + DEFAULT_SPAN,
+                    "count": None,
+                    "exceptions": [],
+                })
+            if series_rows:
+                db.execute(insert(RecurrenceSeries), series_rows)
+        db.commit()
+
+    return {"users": users, "events_per_user": events, "series_per_user": series, "seed": seed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed benchmark users, events and series")
+    parser.add_argument("--database-url", default="sqlite:////tmp/bench_api.db")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--events", type=int, default=10000, help="stored events per user")
+    parser.add_argument("--series", type=int, default=30, help="recurrence series per user")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    dataset = seed_database(sessionmaker(bind=engine), args.users, args.events, args.series, args.seed)
+    print(f"Seeded {dataset} in {time.perf_counter() - started:.1f}s")
+    print(f"Log in as {bench_username(0)} / {BENCH_PASSWORD}")
+
+if __name__ == "__main__":
+    main()
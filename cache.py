@@ -0,0 +1,175 @@
+"""
+Read-through caches for month views and calendar feeds.
+
+Month views (GET /api/events?month=YYYY-MM) are cached per user and month,
+stamped with the change counter they were read at; an entry of another
+counter is a miss. Every write also drops the months it touches. Rendered
+calendar feeds are keyed by the user's change counter, so a write simply makes the
+old entry unreachable. The backend is pluggable: an in-process LRU by
+default, or Redis (or anything speaking its protocol) when CACHE_URL is a
+redis:// URL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from dateutil.relativedelta import relativedelta
+
+from config import CACHE_URL, MONTH_CACHE_SIZE, MONTH_CACHE_TTL, FEED_CACHE_SIZE, FEED_CACHE_TTL
+from recurrence import DEFAULT_SPAN
+from serialization import dumps, loads
+
+class CacheBackend:
+    """Interface of a month view cache backend"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Return a cached value, or None"""
+        raise NotImplementedError
+
+    def set(self, key: str, value):
+        """Cache a JSON-compatible value"""
+        raise NotImplementedError
+
+    def delete_many(self, keys: List[str]):
+        """Drop keys from the cache"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Hit and miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+class LRUCache(CacheBackend):
+    """In-process LRU cache with a time-to-live"""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats["size"] = len(self._entries)
+        return stats
+
+class RedisCache(CacheBackend):
+    """Cache stored in Redis, shared by all workers"""
+
+    def __init__(self, url: str, ttl: float):
+        super().__init__()
+        import redis  # Optional dependency, only needed for redis:// cache URLs
+
+        self.ttl = int(ttl)
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        raw = self._client.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return loads(raw)
+
+    def set(self, key: str, value):
+        self._client.set(key, dumps(value), ex=self.ttl)
+
+    def delete_many(self, keys: List[str]):
+        if keys:
+            self._client.delete(*keys)
+
+def create_cache(url: str, max_size: int, ttl: float) -> CacheBackend:
+    """Create the cache backend for a CACHE_URL"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, ttl)
+    if url in ("", "memory://"):
+        return LRUCache(max_size, ttl)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+month_cache = create_cache(CACHE_URL, MONTH_CACHE_SIZE, MONTH_CACHE_TTL)
+feed_cache = create_cache(CACHE_URL, FEED_CACHE_SIZE, FEED_CACHE_TTL)
+
+def month_key(user_id: int, month: str) -> str:
+    """Cache key of a user's month view"""
+    return f"events:{user_id}:{month}"
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    """Months ('YYYY-MM') from start's month through end's month, inclusive"""
+    months = []
+    current = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while current <= end:
+        months.append(current.strftime("%Y-%m"))
+        current += relativedelta(months=1)
+    return months
+
+def window_months(start: datetime, end: datetime) -> List[str]:
+    """Months overlapping the half-open window [start, end)"""
+    return months_between(start, end - timedelta(microseconds=1))
+
+def series_months(series) -> List[str]:
+    """Months a recurrence series can have occurrences in"""
+    return months_between(series.anchor, series.until or series.anchor + DEFAULT_SPAN)
+
+def invalidate_months(user_id: int, months: Iterable[str]):
+    """Drop cached month views of a user"""
+    month_cache.delete_many([month_key(user_id, month) for month in set(months)])
+
+def get_month(user_id: int, month: str, version: int) -> Optional[dict]:
+    """Cached month view of a user at a change counter, or None"""
+    entry = month_cache.get(month_key(user_id, month))
+    # An entry filled at another version is a miss: a fill racing a write, or one
+    # from a worker whose in-process cache didn't see another worker's invalidation
+    if entry is None or entry["version"] != version:
+        return None
+    return entry["events"]
+
+def set_month(user_id: int, month: str, version: int, events_by_date: dict):
+    """Cache a user's month view read at a change counter"""
+    month_cache.set(month_key(user_id, month), {"version": version, "events": events_by_date})
+
+def get_feed(user_id: int, version: int) -> Optional[str]:
+    """Cached calendar feed of a user at a change counter, or None"""
+    return feed_cache.get(f"feed:{user_id}:{version}")
+
+def set_feed(user_id: int, version: int, body: str):
+    """Cache a user's rendered calendar feed"""
+    feed_cache.set(f"feed:{user_id}:{version}", body)
@@ -1,11 +1,120 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
+import threading
+import time
+from sqlalchemy import create_engine, event, exc, insert, select, update, Column, ForeignKey, Index, Integer, String, DateTime, Text, Boolean, JSON
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from sqlalchemy.sql import func
-from datetime import datetime
-from config import DATABASE_URL
+from sqlalchemy.types import TypeDecorator
+from datetime import datetime, timezone
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_TRANSACTION_POOLER, SQL_DEBUG, SQL_DEBUG_SLOW_MS
+from config import SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT_MS, SQLITE_SYNCHRONOUS
+import recurrence
+import sql_debug
+
+class PoolStats:
+    """How often and how long requests waited to get a database connection"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+    
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+    
+    def snapshot(self, pool) -> dict:
+        """Counters plus the current state of a pool"""
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+pool_stats = PoolStats()
+
+class _TimedPool:
+    """Pool mixin recording how long connect() takes to hand out a connection"""
+    
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    """QueuePool that records checkout waits"""
+
+class TimedNullPool(_TimedPool, NullPool):
+    """NullPool that records connection setup time"""
+
+def _sqlite_in_memory(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:"))
+
+def _engine_options(url: str) -> dict:
+    """Pool settings for the configured database"""
+    if _sqlite_in_memory(url):
+        # Each connection of an in-memory database is a database of its own: share one
+        # connection across the startup thread and the request worker threads
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    if DB_TRANSACTION_POOLER:
+        # The pooler does the pooling. psycopg prepares statements after a few executions,
+        # which breaks when the next transaction runs on another server connection.
+        return {"poolclass": TimedNullPool, "connect_args": {"prepare_threshold": None}}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Tune a new SQLite connection for many readers and one writer"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if not _sqlite_in_memory(DATABASE_URL):
+            # Readers don't block the writer or each other
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
 
 # Create engine
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_engine(DATABASE_URL, echo=False, **_engine_options(DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _configure_sqlite)
+
+# Opt-in slow query logging and statement counting for N+1 detection
+if SQL_DEBUG:
+    sql_debug.instrument(engine, SQL_DEBUG_SLOW_MS)
+
+def get_pool_stats() -> dict:
+    """Checkout counters and current state of the engine's connection pool"""
+    return pool_stats.snapshot(engine.pool)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -13,28 +122,192 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create base class for models
 Base = declarative_base()
 
+class _SQLiteUTCDateTime(sqlite.DATETIME):
+    """SQLite DATETIME read back as aware UTC datetimes"""
+    
+    def result_processor(self, dialect, coltype):
+        # Parsing with the offset appended is several times faster than datetime.replace(tzinfo=...)
+        def process(value):
+            return None if value is None else datetime.fromisoformat(value + "+00:00")
+        return process
+
+class UTCDateTime(TypeDecorator):
+    """Timezone-aware DateTime that reads back the same on every database.
+    
+    SQLite has no timezone type, so values are stored as UTC and returned as
+    aware UTC datetimes, like PostgreSQL returns timestamptz.
+    """
+    impl = DateTime
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(_SQLiteUTCDateTime())
+        return super().load_dialect_impl(dialect)
+    
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
 # Event model
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Per-user reads are range scans over one user's dates
+        Index("ix_events_user_id_date", "user_id", "date"),
+        Index("ix_events_user_id_change_version", "user_id", "change_version"),
+        # Event IDs are chosen by clients, so they are only unique per user
+        Index("ix_events_user_id_event_id", "user_id", "event_id", unique=True),
+        # On SQLite, listings read every column from the index without visiting the table
+        Index("ix_events_user_id_date_listing", "user_id", "date", "event_id", "title", "recurrence_type", "recurrence_group_id").ddl_if(dialect="sqlite"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    event_id = Column(String(255), unique=True, index=True, nullable=False)  # Frontend ID
+    event_id = Column(String(255), nullable=False)  # Frontend ID, unique per user
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Owner
     title = Column(Text, nullable=False)
-    date = Column(DateTime(timezone=True), nullable=False, index=True)
+    date = Column(UTCDateTime(timezone=True), nullable=False, index=True)
     recurrence_type = Column(String(50), nullable=True)  # 'daily', 'weekly', 'monthly', or null
     recurrence_group_id = Column(String(255), nullable=True, index=True)  # Groups recurring events together
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    change_version = Column(Integer, nullable=False, default=0, server_default="0")  # Owner's events_version at the last change
+    created_at = Column(UTCDateTime(timezone=True), server_default=func.now())
+    updated_at = Column(UTCDateTime(timezone=True), onupdate=func.now())
     
     def to_dict(self):
         """Convert event to dictionary for API response"""
+        return event_dict(self)
+
+# Columns of an event's API representation; selecting only these skips building ORM objects
+EVENT_COLUMNS = (Event.event_id, Event.title, Event.date, Event.recurrence_type, Event.recurrence_group_id)
+
+def event_dict(row):
+    """Convert an Event, or a row of EVENT_COLUMNS, to dictionary for API response"""
+    return {
+        "id": row.event_id,
+        "title": row.title,
+        "date": row.date.isoformat(),
+        "recurrence_type": row.recurrence_type,
+        "recurrence_group_id": row.recurrence_group_id
+    }
+
+# Rows per INSERT statement when writing events in bulk
+INSERT_BATCH_SIZE = 1000
+
+def insert_events(db, rows):
+    """Insert event rows with multi-row INSERT ... RETURNING statements.
+    
+    Returns the API dictionaries of the inserted events, so callers don't need
+    to refresh ORM objects one by one after committing.
+    """
+    created = []
+    for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+        result = db.execute(
+            insert(Event)
+            .values(rows[offset:offset + INSERT_BATCH_SIZE])
+            .returning(*EVENT_COLUMNS)
+        )
+        created.extend(event_dict(row) for row in result)
+    return created
+
+# INSERT constructs that support ON CONFLICT, per dialect
+_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def insert_new_events(db, rows):
+    """Insert event rows in batches with INSERT ... ON CONFLICT (user_id, event_id) DO NOTHING.
+    
+    Rows whose event_id the user already has are skipped. Returns the number inserted.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in _CONFLICT_INSERTS:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {dialect}")
+    # One cached statement run with executemany; a multi-row VALUES clause would be recompiled per batch
+    statement = _CONFLICT_INSERTS[dialect](Event.__table__).on_conflict_do_nothing(index_elements=["user_id", "event_id"])
+    if dialect == "sqlite":
+        # With RETURNING, executemany is sent as multi-row VALUES statements ("insertmanyvalues").
+        # One statement per row would make the title search triggers flush the FTS index per row.
+        statement = statement.returning(Event.id)
+    connection = db.connection()
+    inserted = 0
+    for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+        result = connection.execute(statement, rows[offset:offset + INSERT_BATCH_SIZE])
+        inserted += len(result.all()) if dialect == "sqlite" else result.rowcount
+    return inserted
+
+# Recurrence series model: one row per recurring event, occurrences are expanded on read
+class RecurrenceSeries(Base):
+    __tablename__ = "recurrence_series"
+    __table_args__ = (
+        Index("ix_recurrence_series_user_id_anchor", "user_id", "anchor"),
+        Index("ix_recurrence_series_user_id_series_id", "user_id", "series_id", unique=True),
+        Index("ix_recurrence_series_user_id_change_version", "user_id", "change_version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    series_id = Column(String(255), nullable=False)  # Frontend ID unique per user, used as the occurrences' group ID
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Owner
+    title = Column(Text, nullable=False)
+    anchor = Column(UTCDateTime(timezone=True), nullable=False, index=True)  # First occurrence
+    recurrence_types = Column(String(255), nullable=False)  # Comma-separated, e.g. 'daily,weekly'
+    until = Column(UTCDateTime(timezone=True), nullable=True, index=True)  # Last possible occurrence, null if endless
+    count = Column(Integer, nullable=True)  # Maximum occurrences per recurrence type
+    exceptions = Column(JSON, nullable=False, default=list)  # 'YYYY-MM-DD' dates removed from the series
+    change_version = Column(Integer, nullable=False, default=0, server_default="0")  # Owner's events_version at the last change
+    created_at = Column(UTCDateTime(timezone=True), server_default=func.now())
+    updated_at = Column(UTCDateTime(timezone=True), onupdate=func.now())
+    
+    @property
+    def types(self):
+        """Recurrence types of this series as a list"""
+        return self.recurrence_types.split(",")
+    
+    def occurrences(self, start=None, end=None):
+        """Yield (date, recurrence_type) pairs of this series within [start, end)"""
+        return recurrence.expand(
+            self.anchor,
+            self.types,
+            start=start,
+            end=end,
+            until=self.until,
+            count=self.count,
+            exceptions=self.exceptions or (),
+        )
+    
+    def to_dict(self):
+        """Convert the series rule to dictionary for API response"""
         return {
-            "id": self.event_id,
+            "id": self.series_id,
             "title": self.title,
-            "date": self.date.isoformat(),
-            "recurrence_type": self.recurrence_type,
-            "recurrence_group_id": self.recurrence_group_id
+            "anchor": self.anchor.isoformat(),
+            "recurrence_types": self.types,
+            "until": self.until.isoformat() if self.until else None,
+            "count": self.count,
+            "exceptions": list(self.exceptions or [])
         }
+    
+    def occurrence_dict(self, occurrence, recurrence_type):
+        """Convert a generated occurrence to the same shape as Event.to_dict()"""
+        return {
+            "id": recurrence.occurrence_id(self.series_id, occurrence),
+            "title": self.title,
+            "date": occurrence.isoformat(),
+            "recurrence_type": recurrence_type,
+            "recurrence_group_id": self.series_id
+        }
+
+# Tombstone model: remembers deleted events and series for delta sync
+class EventTombstone(Base):
+    __tablename__ = "event_tombstones"
+    __table_args__ = (
+        Index("ix_event_tombstones_user_id_change_version", "user_id", "change_version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_id = Column(String(255), nullable=False)  # Deleted event ID or series ID
+    kind = Column(String(20), nullable=False)  # 'event' or 'series'
+    change_version = Column(Integer, nullable=False)  # Owner's events_version of the deletion
+    deleted_at = Column(UTCDateTime(timezone=True), server_default=func.now())
 
 # User model for authentication
 class User(Base):
@@ -44,8 +317,60 @@ class User(Base):
     username = Column(String(100), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    events_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on every change to the user's events
+    created_at = Column(UTCDateTime(timezone=True), server_default=func.now())
+    updated_at = Column(UTCDateTime(timezone=True), onupdate=func.now())
+
+# Trigram full-text index of event titles on SQLite, kept in sync with the events table by
+# triggers. PostgreSQL uses a pg_trgm index instead, see migrate_search_index.py.
+_SQLITE_SEARCH_INDEX = (
+    "CREATE VIRTUAL TABLE events_fts USING fts5(title, content='events', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts(rowid, title) VALUES (new.id, new.title);
+    END""",
+    """CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    """CREATE TRIGGER events_fts_update AFTER UPDATE OF title ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO events_fts(rowid, title) VALUES (new.id, new.title);
+    END""",
+    # Index the events that existed before the index
+    "INSERT INTO events_fts(events_fts) VALUES ('rebuild')",
+)
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_sqlite_search_index(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    if connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'events_fts'").first():
+        return
+    try:
+        connection.exec_driver_sql(_SQLITE_SEARCH_INDEX[0])
+    except exc.OperationalError:
+        # Without FTS5 or its trigram tokenizer (SQLite < 3.34) search scans titles instead
+        return
+    for statement in _SQLITE_SEARCH_INDEX[1:]:
+        connection.exec_driver_sql(statement)
+
+def get_events_version(db, user_id):
+    """Current change counter of a user's events"""
+    return db.execute(select(User.events_version).where(User.id == user_id)).scalar() or 0
+
+def bump_events_version(db, user_id):
+    """Increment a user's change counter in the current transaction and return the new value.
+    
+    The UPDATE locks the user's row until commit, so concurrent writers of the
+    same user's events are ordered by their version. updated_at is passed through,
+    otherwise its onupdate would stamp every event write as an account change.
+    """
+    return db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(events_version=User.events_version + 1, updated_at=User.updated_at)
+        .returning(User.events_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
 
 # Dependency to get database session
 def get_db():
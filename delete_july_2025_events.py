@@ -4,8 +4,21 @@ Delete all events from July 2025
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, and_
-from database import engine, Event
+from datetime import datetime, timezone
+from database import engine, User, bump_events_version
+from cache import invalidate_months
+from event_delete import bulk_delete
+from storage import store
+
+JULY_START = datetime(2025, 7, 1, tzinfo=timezone.utc)
+JULY_END = datetime(2025, 8, 1, tzinfo=timezone.utc)
+
+def july_2025_events(session, user_id):
+    """(date, title) of a user's stored events and series occurrences in July 2025"""
+    found = [(row.date, row.title) for row in store.stored_events(session, user_id, JULY_START, JULY_END)]
+    for series in store.series_in_window(session, user_id, JULY_START, JULY_END):
+        found.extend((occurrence, series.title) for occurrence, _ in series.occurrences(JULY_START, JULY_END))
+    return sorted(found)
 
 def delete_july_2025_events():
     """Delete all events from July 2025"""
@@ -13,16 +26,12 @@ def delete_july_2025_events():
     session = Session(engine)
     
     try:
-        # Query for July 2025 events
-        july_2025_events = session.query(Event).filter(
-            and_(
-                extract('year', Event.date) == 2025,
-                extract('month', Event.date) == 7
-            )
-        ).all()
+        # Query for July 2025 events of every user, including occurrences of recurring series
+        found = {user.id: july_2025_events(session, user.id) for user in session.query(User)}
+        found = {user_id: events for user_id, events in found.items() if events}
         
         # Count events to be deleted
-        count = len(july_2025_events)
+        count = sum(len(events) for events in found.values())
         
         if count == 0:
             print("No events found for July 2025.")
@@ -30,19 +39,23 @@ def delete_july_2025_events():
         
         # Show events that will be deleted
         print(f"Found {count} events in July 2025:")
-        for event in july_2025_events:
-            print(f"  - {event.date.strftime('%Y-%m-%d')}: {event.title}")
+        for events in found.values():
+            for event_date, title in events:
+                print(f"  - {event_date.strftime('%Y-%m-%d')}: {title}")
         
         # Confirm deletion
         confirm = input(f"\nAre you sure you want to delete these {count} events? (yes/no): ")
         
         if confirm.lower() == 'yes':
-            # Delete the events
-            for event in july_2025_events:
-                session.delete(event)
-            
-            session.commit()
-            print(f"\nSuccessfully deleted {count} events from July 2025.")
+            # Delete like DELETE /api/events?month=2025-07, one change per user
+            deleted = 0
+            for user_id in found:
+                touched_months = set()
+                version = bump_events_version(session, user_id)
+                deleted += bulk_delete(session, user_id, version, touched_months, JULY_START, JULY_END)
+                session.commit()
+                invalidate_months(user_id, touched_months)
+            print(f"\nSuccessfully deleted {deleted} events from July 2025.")
         else:
             print("\nDeletion cancelled.")
             
@@ -4,8 +4,13 @@ Delete all events from July 2025 (automatic)
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, and_
-from database import engine, Event
+from datetime import datetime, timezone
+from database import engine, User, bump_events_version
+from cache import invalidate_months
+from event_delete import bulk_delete
+
+JULY_START = datetime(2025, 7, 1, tzinfo=timezone.utc)
+JULY_END = datetime(2025, 8, 1, tzinfo=timezone.utc)
 
 def delete_july_2025_events():
     """Delete all events from July 2025"""
@@ -13,27 +18,24 @@ def delete_july_2025_events():
     session = Session(engine)
     
     try:
-        # Query and count July 2025 events
-        july_2025_count = session.query(Event).filter(
-            and_(
-                extract('year', Event.date) == 2025,
-                extract('month', Event.date) == 7
-            )
-        ).count()
+        # Delete like DELETE /api/events?month=2025-07 for every user, including
+        # occurrences of recurring series; one change per user that had events
+        deleted = 0
+        for (user_id,) in session.query(User.id).all():
+            touched_months = set()
+            version = bump_events_version(session, user_id)
+            user_deleted = bulk_delete(session, user_id, version, touched_months, JULY_START, JULY_END)
+            if user_deleted == 0:
+                session.rollback()
+                continue
+            session.commit()
+            invalidate_months(user_id, touched_months)
+            deleted += user_deleted
         
-        if july_2025_count == 0:
+        if deleted == 0:
             print("No events found for July 2025.")
             return
         
-        # Delete all July 2025 events
-        deleted = session.query(Event).filter(
-            and_(
-                extract('year', Event.date) == 2025,
-                extract('month', Event.date) == 7
-            )
-        ).delete()
-        
-        session.commit()
         print(f"Successfully deleted {deleted} events from July 2025.")
         
     except Exception as e:
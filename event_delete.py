@@ -0,0 +1,74 @@
+"""
+Bulk deletion of a user's events, shared by the API and maintenance scripts.
+
+Stored events are removed with one DELETE ... WHERE and remembered as
+tombstones for delta sync. Recurrence series are dropped when the filters
+cover them entirely, otherwise the matching dates become exceptions. The
+caller owns the transaction and bumps the user's change counter.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, insert, literal, select
+
+from cache import months_between, series_months, window_months
+from database import Event, EventTombstone, RecurrenceSeries
+from recurrence import DEFAULT_SPAN, align
+from storage import store
+
+def bulk_delete(db, user_id: int, version: int, touched_months: set, start: Optional[datetime] = None, end: Optional[datetime] = None, group_id: Optional[str] = None, title: Optional[str] = None) -> int:
+    """Delete a user's stored events and series occurrences matching all given filters, returns the count.
+
+    Months that had events deleted are added to touched_months.
+    """
+    conditions = [Event.user_id == user_id]
+    if start is not None:
+        conditions.append(Event.date >= start)
+    if end is not None:
+        conditions.append(Event.date < end)
+    if group_id is not None:
+        conditions.append(Event.recurrence_group_id == group_id)
+    if title is not None:
+        conditions.append(Event.title == title)
+
+    # Months to invalidate: the window itself, or the date span of the matching rows
+    if start is not None and end is not None:
+        touched_months.update(window_months(start, end))
+    else:
+        first, last = db.execute(select(func.min(Event.date), func.max(Event.date)).where(*conditions)).one()
+        if first is not None:
+            touched_months.update(months_between(first, last))
+
+    # One INSERT ... SELECT for the tombstones and one DELETE ... WHERE for all stored rows
+    db.execute(insert(EventTombstone).from_select(
+        ["user_id", "event_id", "kind", "change_version"],
+        select(Event.user_id, Event.event_id, literal("event"), literal(version)).where(*conditions)
+    ))
+    deleted_count = db.query(Event).filter(*conditions).delete(synchronize_session=False)
+
+    # Series rows: drop the whole rule when the window covers it, otherwise skip the dates in the window
+    series_query = db.query(RecurrenceSeries)
+    if group_id is not None:
+        series_query = series_query.filter(RecurrenceSeries.series_id == group_id)
+    if title is not None:
+        series_query = series_query.filter(RecurrenceSeries.title == title)
+    series_list = store.series_in_window(db, user_id, start, end, series_query)
+    for series in series_list:
+        covers_start = start is None or align(start, series.anchor) <= series.anchor
+        covers_end = end is None or (series.until is not None and align(end, series.anchor) > series.until)
+        if covers_start and covers_end:
+            # Never expand an endless series without a window
+            series_end = None if series.until is not None else series.anchor + DEFAULT_SPAN
+            deleted_count += sum(1 for _ in series.occurrences(end=series_end))
+            touched_months.update(series_months(series))
+            db.add(EventTombstone(user_id=user_id, event_id=series.series_id, kind="series", change_version=version))
+            db.delete(series)
+        else:
+            skipped = [occurrence.date().isoformat() for occurrence, _ in series.occurrences(start, end)]
+            touched_months.update(day[:7] for day in skipped)
+            if skipped:
+                series.exceptions = list(series.exceptions or []) + skipped
+                series.change_version = version
+                deleted_count += len(skipped)
+    return deleted_count
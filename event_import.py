@@ -0,0 +1,174 @@
+"""
+Bulk import of events from NDJSON, CSV or iCalendar streams.
+
+Records are parsed lazily and written in batches with INSERT ... ON CONFLICT
+(user_id, event_id) DO NOTHING, so events the user already has are skipped
+without a lookup per row. The whole import is one transaction with one change counter
+bump: it either lands completely or not at all.
+"""
+
+import csv
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional, Tuple
+
+import ics
+from database import INSERT_BATCH_SIZE, RecurrenceSeries, bump_events_version, insert_new_events
+from recurrence import RECURRENCE_TYPES, parse_occurrence_id
+from serialization import loads
+
+IMPORT_FORMATS = ("ndjson", "csv", "ics")
+
+# Request bodies up to this size are buffered in memory, larger ones on disk
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+class ImportFormatError(ValueError):
+    """A record of an import stream could not be parsed"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+def _parse_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError as e:
+            raise ImportFormatError(number, f"invalid JSON ({e})")
+        if not isinstance(record, dict):
+            raise ImportFormatError(number, "expected a JSON object")
+        yield number, record
+
+def _parse_csv(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, record
+
+def _unfold(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """Join folded iCalendar content lines, yielding (first line number, line)"""
+    current, start = None, 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, number
+    if current is not None:
+        yield start, current
+
+def _unescape_text(value: str) -> str:
+    result, escaped = [], False
+    for char in value:
+        if escaped:
+            result.append("\n" if char in "nN" else char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            result.append(char)
+    return "".join(result)
+
+def _parse_ics_datetime(value: str) -> datetime:
+    if len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d")
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    return datetime.strptime(value, "%Y%m%dT%H%M%S")
+
+def _parse_ics(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    record, start = None, 0
+    for number, line in _unfold(lines):
+        name, _, value = line.partition(":")
+        name = name.partition(";")[0].upper()  # Parameters such as TZID are ignored
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            record, start = {}, number
+        elif name == "END" and value.upper() == "VEVENT" and record is not None:
+            yield start, record
+            record = None
+        elif record is None:
+            continue
+        elif name == "UID":
+            # Strip our own suffix so exports round-trip
+            record["id"] = value.removesuffix(ics.UID_SUFFIX)
+        elif name == "SUMMARY":
+            record["title"] = _unescape_text(value)
+        elif name == "DTSTART":
+            try:
+                record["date"] = _parse_ics_datetime(value)
+            except ValueError:
+                raise ImportFormatError(number, f"invalid DTSTART '{value}'")
+
+_PARSERS = {"ndjson": _parse_ndjson, "csv": _parse_csv, "ics": _parse_ics}
+
+def _to_row(number: int, record: dict, user_id: int, version: int) -> dict:
+    """Validate a parsed record and turn it into an events row"""
+    event_id = str(record.get("id") or "").strip()
+    title = str(record.get("title") or "").strip()
+    if not event_id:
+        raise ImportFormatError(number, "missing id")
+    if len(event_id) > 255:
+        raise ImportFormatError(number, "id is longer than 255 characters")
+    if not title:
+        raise ImportFormatError(number, "missing title")
+
+    event_date = record.get("date")
+    if not isinstance(event_date, datetime):
+        try:
+            event_date = datetime.fromisoformat(str(event_date or "").replace("Z", "+00:00"))
+        except ValueError:
+            raise ImportFormatError(number, f"invalid date '{event_date}'")
+
+    recurrence_type = record.get("recurrence_type") or None
+    if recurrence_type is not None and recurrence_type not in RECURRENCE_TYPES:
+        raise ImportFormatError(number, f"unknown recurrence type '{recurrence_type}'")
+
+    return {
+        "event_id": event_id,
+        "user_id": user_id,
+        "title": title,
+        "date": event_date,
+        "recurrence_type": recurrence_type,
+        "recurrence_group_id": record.get("recurrence_group_id") or None,
+        "change_version": version
+    }
+
+def import_events(db, user_id: int, lines: Iterable[str], import_format: str, touched_months: Optional[set] = None) -> dict:
+    """Import events from a text stream in the current transaction and report counts and throughput.
+
+    Months that received events are added to touched_months. The caller commits.
+    """
+    started = time.perf_counter()
+    version = bump_events_version(db, user_id)
+
+    # Occurrences of the user's own series are generated on read, storing them would duplicate them
+    series_ids = {series_id for (series_id,) in db.query(RecurrenceSeries.series_id).filter(RecurrenceSeries.user_id == user_id)}
+
+    received = inserted = 0
+    batch = []
+    for number, record in _PARSERS[import_format](lines):
+        received += 1
+        row = _to_row(number, record, user_id, version)
+        parsed = parse_occurrence_id(row["event_id"])
+        if parsed and parsed[0] in series_ids:
+            continue
+        if touched_months is not None:
+            touched_months.add(row["date"].strftime("%Y-%m"))
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            inserted += insert_new_events(db, batch)
+            batch = []
+    if batch:
+        inserted += insert_new_events(db, batch)
+
+    seconds = time.perf_counter() - started
+    return {
+        "received": received,
+        "inserted": inserted,
+        "skipped": received - inserted,
+        "seconds": round(seconds, 3),
+        "events_per_second": round(received / seconds) if seconds else received
+    }
@@ -0,0 +1,88 @@
+"""
+Streaming export of a user's events as NDJSON, CSV or iCalendar.
+
+Stored events are read with yield_per, which uses a server-side cursor on
+PostgreSQL, and recurrence series are expanded lazily and merged in date
+order, so memory stays flat however many occurrences are exported.
+"""
+
+import csv
+import heapq
+import io
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Iterator, Optional, Tuple
+
+import ics
+from database import RecurrenceSeries, event_dict
+from recurrence import DEFAULT_SPAN
+from serialization import dumps
+from storage import store
+
+# Rows fetched per round trip, and rows per chunk handed to the response
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ics": ("text/calendar; charset=utf-8", "ics"),
+}
+
+CSV_FIELDS = ["id", "title", "date", "recurrence_type", "recurrence_group_id"]
+
+def _stored_events(db, user_id: int, start: Optional[datetime], end: Optional[datetime]) -> Iterator[Tuple[datetime, dict]]:
+    for row in store.stored_events(db, user_id, start, end, yield_per=EXPORT_BATCH_SIZE):
+        yield row.date, event_dict(row)
+
+def _series_events(series: RecurrenceSeries, start: Optional[datetime], end: Optional[datetime]) -> Iterator[Tuple[datetime, dict]]:
+    if end is None and series.until is None:
+        # Never expand an endless series without a window
+        end = series.anchor + DEFAULT_SPAN
+    for occurrence, recurrence_type in series.occurrences(start, end):
+        yield occurrence, series.occurrence_dict(occurrence, recurrence_type)
+
+def iter_events(db, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[dict]:
+    """Yield a user's stored events and generated occurrences within [start, end), in date order"""
+    streams = [_series_events(series, start, end) for series in store.series_in_window(db, user_id, start, end)]
+    streams.append(_stored_events(db, user_id, start, end))
+    for _, item in heapq.merge(*streams, key=itemgetter(0)):
+        yield item
+
+def _chunked(lines: Iterator[str]) -> Iterator[str]:
+    """Join lines into chunks of EXPORT_BATCH_SIZE"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+def _ndjson_lines(items: Iterator[dict]) -> Iterator[str]:
+    for item in items:
+        yield dumps(item).decode("utf-8") + "\n"
+
+def _csv_lines(items: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for item in items:
+        writer.writerow(item)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _ics_lines(items: Iterator[dict]) -> Iterator[str]:
+    stamp = datetime.now(timezone.utc)
+    yield ics.calendar_header("Task Calendar")
+    for item in items:
+        yield ics.vevent(item["id"] + ics.UID_SUFFIX, datetime.fromisoformat(item["date"]), item["title"], stamp)
+    yield ics.calendar_footer()
+
+_WRITERS = {"ndjson": _ndjson_lines, "csv": _csv_lines, "ics": _ics_lines}
+
+def export_events(db, user_id: int, export_format: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[str]:
+    """Yield a user's events in an export format, in chunks of text"""
+    return _chunked(_WRITERS[export_format](iter_events(db, user_id, start, end)))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Export a user's events as NDJSON, CSV or iCalendar.
+
+Streams rows in constant memory, like GET /api/events/export.
+
+    python export_events.py admin --format csv --start 2025-01-01 --end 2026-01-01 -o events.csv
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy.orm import Session
+from database import engine, User
+from export import EXPORT_FORMATS, export_events
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's events")
+    parser.add_argument("username")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="include events on or after this date")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="include events before this date")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    session = Session(engine)
+    try:
+        user = session.query(User).filter(User.username == args.username).first()
+        if not user:
+            print(f"User '{args.username}' not found.", file=sys.stderr)
+            sys.exit(1)
+
+        output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            for chunk in export_events(session, user.id, args.format, args.start, args.end):
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+iCalendar subscription feed of a user's events.
+
+Recurrence series are written as one VEVENT with an RRULE per recurrence
+type instead of one VEVENT per occurrence, so the feed grows with the number
+of rules rather than the number of occurrences.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+import ics
+from database import RecurrenceSeries
+from recurrence import DEFAULT_SPAN, align, iter_rule
+from storage import store
+
+# Rows fetched per round trip when reading stored events
+FEED_BATCH_SIZE = 1000
+
+_FREQUENCIES = {
+    "daily": "FREQ=DAILY",
+    "weekly": "FREQ=WEEKLY",
+    "monthly": "FREQ=MONTHLY",
+    "quarterly": "FREQ=MONTHLY;INTERVAL=3",
+}
+
+def _uid(event_id: str) -> str:
+    return f"{event_id}{ics.UID_SUFFIX}"
+
+def rrule(recurrence_type: str, anchor: datetime, until: Optional[datetime] = None, count: Optional[int] = None) -> str:
+    """RRULE line producing the same dates as recurrence.iter_rule; pass until or count, not both"""
+    parts = [_FREQUENCIES[recurrence_type]]
+    if recurrence_type in ("monthly", "quarterly") and anchor.day > 28:
+        # Months shorter than the anchor day fall back to their last day, like relativedelta
+        parts.append("BYMONTHDAY=" + ",".join(str(day) for day in range(28, anchor.day + 1)))
+        parts.append("BYSETPOS=-1")
+    if count is not None:
+        parts.append(f"COUNT={count}")
+    if until is not None:
+        parts.append(f"UNTIL={ics.format_datetime(align(until, anchor))}")
+    return "RRULE:" + ";".join(parts)
+
+def _exdate(anchor: datetime, dates: List[datetime]) -> str:
+    return "EXDATE:" + ",".join(ics.format_datetime(value) for value in sorted(dates))
+
+def series_vevents(series: RecurrenceSeries, stamp: datetime) -> str:
+    """VEVENTs of a series, one per recurrence type.
+
+    expand() reports a date produced by several types once, for the first
+    type, so later types exclude the dates earlier ones already cover.
+    Exceptions are excluded from every type.
+    """
+    until = series.until
+    if until is None and series.count is None:
+        # Endless series are cut off like everywhere else that expands without a window
+        until = series.anchor + DEFAULT_SPAN
+    exceptions = [
+        datetime.combine(datetime.fromisoformat(day).date(), series.anchor.timetz())
+        for day in series.exceptions or []
+    ]
+
+    components = []
+    covered = set()
+    for position, recurrence_type in enumerate(series.types):
+        dates = list(iter_rule(recurrence_type, series.anchor, until=until, count=series.count))
+        excluded = exceptions + [value for value in dates if value in covered]
+        covered.update(dates)
+        if series.count is not None and len(dates) == series.count:
+            extra = [rrule(recurrence_type, series.anchor, count=series.count)]
+        else:
+            # RRULE can't combine COUNT and UNTIL, the earlier of the two ends the rule
+            extra = [rrule(recurrence_type, series.anchor, until=until)]
+        if excluded:
+            extra.append(_exdate(series.anchor, excluded))
+        uid = series.series_id if position == 0 else f"{series.series_id}-{recurrence_type}"
+        components.append(ics.vevent(_uid(uid), series.anchor, series.title, stamp, extra))
+    return "".join(components)
+
+def iter_feed(db, user_id: int, name: str) -> Iterator[str]:
+    """Yield the feed of a user's stored events and series as iCalendar text"""
+    stamp = datetime.now(timezone.utc)
+    yield ics.calendar_header(name)
+    for series in db.query(RecurrenceSeries).filter(RecurrenceSeries.user_id == user_id).order_by(RecurrenceSeries.anchor):
+        yield series_vevents(series, stamp)
+    for row in store.stored_events(db, user_id, yield_per=FEED_BATCH_SIZE):
+        yield ics.vevent(_uid(row.event_id), row.date, row.title, stamp)
+    yield ics.calendar_footer()
+
+def render_feed(db, user_id: int, name: str) -> str:
+    """The complete feed of a user as one string"""
+    return "".join(iter_feed(db, user_id, name))
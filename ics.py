@@ -0,0 +1,68 @@
+"""
+iCalendar (RFC 5545) formatting helpers.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+PRODID = "-//Task Calendar//EN"
+
+# Appended to event IDs to form globally unique UIDs
+UID_SUFFIX = "@task-calendar"
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT property value"""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+def fold(line: str) -> str:
+    """Fold a content line to 75 octets, continuation lines start with a space"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+def format_datetime(value: datetime) -> str:
+    """DATE-TIME value: UTC for aware datetimes, floating local time for naive ones"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return value.strftime("%Y%m%dT%H%M%S")
+
+def calendar_header(name: Optional[str] = None) -> str:
+    """Opening lines of a VCALENDAR"""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"]
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+    return "".join(fold(line) for line in lines)
+
+def calendar_footer() -> str:
+    """Closing line of a VCALENDAR"""
+    return fold("END:VCALENDAR")
+
+def vevent(uid: str, start: datetime, summary: str, stamp: datetime, extra: List[str] = ()) -> str:
+    """A VEVENT component; extra holds already formatted property lines"""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{format_datetime(stamp)}",
+        f"DTSTART:{format_datetime(start)}",
+        f"SUMMARY:{escape_text(summary)}",
+        *extra,
+        "END:VEVENT",
+    ]
+    return "".join(fold(line) for line in lines)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Bulk import events for a user from an NDJSON, CSV or iCalendar file.
+
+Events whose ID already exists are skipped, like POST /api/events/import.
+
+    python import_events.py admin calendar.ics
+    python import_events.py admin - --format ndjson < events.ndjson
+"""
+
+import argparse
+import os
+import sys
+from sqlalchemy.orm import Session
+from database import engine, User, init_db
+from event_import import IMPORT_FORMATS, import_events
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a user's events")
+    parser.add_argument("username")
+    parser.add_argument("file", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    args = parser.parse_args()
+
+    import_format = args.format or os.path.splitext(args.file)[1].lstrip(".").lower()
+    if import_format not in IMPORT_FORMATS:
+        parser.error(f"cannot tell the format of '{args.file}', pass --format")
+
+    init_db()
+    session = Session(engine)
+    try:
+        user = session.query(User).filter(User.username == args.username).first()
+        if not user:
+            print(f"User '{args.username}' not found. Create it first with create_user.py.", file=sys.stderr)
+            sys.exit(1)
+
+        source = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8-sig", newline="")
+        try:
+            result = import_events(session, user.id, source, import_format)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Import failed, nothing was imported: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        print(f"Received {result['received']} event(s): {result['inserted']} imported, {result['skipped']} skipped")
+        print(f"Took {result['seconds']}s ({result['events_per_second']} events/s)")
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,54 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-from datetime import datetime, date, timedelta
+from typing import Iterable, List, Dict, Optional, Tuple
+from datetime import datetime, date, time, timedelta, timezone
 from dateutil.relativedelta import relativedelta
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, extract
+import asyncio
+import io
 import os
-import uuid
+import tempfile
+from uuid import uuid4
+from itertools import islice
+import anyio.to_thread
 
-from database import get_db, init_db, Event as EventModel, User
-from config import ALLOWED_ORIGINS, ENVIRONMENT
-from auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+from database import SessionLocal, engine, get_db, get_pool_stats, init_db, insert_events, event_dict, get_events_version, bump_events_version, Event as EventModel, EventTombstone, RecurrenceSeries, User
+from config import ALLOWED_ORIGINS, BATCH_MAX_OPERATIONS, ENVIRONMENT, EVENT_PAGE_SIZE, EVENT_PAGE_SIZE_MAX, METRICS_TOKEN, RECURRENCE_MAX_COUNT, RECURRENCE_MAX_SPAN_DAYS, SQL_DEBUG, SQL_DEBUG_REPEAT_THRESHOLD, STREAM_KEEPALIVE_SECONDS, THREADPOOL_SIZE
+from auth import CurrentUser, password_hasher, user_cache, authenticate_user, create_access_token, create_feed_token, create_stream_token, get_current_active_user, get_feed_user, get_stream_user, get_password_hash_async, get_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from recurrence import RECURRENCE_TYPES, DEFAULT_SPAN, align, count_occurrences, last_occurrence, parse_occurrence_id
+from cache import month_cache, feed_cache, get_month, set_month, get_feed, set_feed, invalidate_months, series_months
+from serialization import FastJSONResponse
+from export import EXPORT_FORMATS, export_events
+from event_delete import bulk_delete
+from event_import import IMPORT_FORMATS, IMPORT_SPOOL_SIZE, import_events
+from feed import render_feed
+from pagination import PageKey, decode_cursor, encode_cursor, merge_page
+from storage import store
+from notifications import KEEPALIVE, broker, format_message
+from summary import GRANULARITIES, summarize
+import metrics
+import sql_debug
 
 app = FastAPI()
 
+# Handlers that use the database are plain `def` functions: FastAPI runs them
+# in its worker threadpool, so a slow query never blocks the event loop.
+# Login and register are async and hand bcrypt to auth.password_hasher.
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
+    # Bound the threadpool that runs blocking database work
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     init_db()
+    with SessionLocal() as db:
+        store.optimize(db)
     print(f"Running in {ENVIRONMENT} mode")
 
 # Configure CORS
@@ -33,6 +60,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and database work per route, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.register_stats("password_hash_pool", "Password hashing pool", password_hasher.stats, counters=("completed", "rejected", "wait_seconds_total"))
+metrics.register_stats("user_cache", "Authenticated user cache", user_cache.stats, counters=("hits", "misses"))
+metrics.register_stats("month_cache", "Month view cache", month_cache.stats, counters=("hits", "misses"))
+metrics.register_stats("feed_cache", "Calendar feed cache", feed_cache.stats, counters=("hits", "misses"))
+metrics.register_stats("change_broker", "Change notification streams", broker.stats)
+metrics.register_stats("db_pool", "Database connection pool", get_pool_stats, counters=("checkouts", "timeouts", "wait_seconds_total"))
+
+# Statements per request and likely N+1 patterns, when SQL_DEBUG is on
+if SQL_DEBUG:
+    app.add_middleware(sql_debug.SQLDebugMiddleware, threshold=SQL_DEBUG_REPEAT_THRESHOLD)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -41,11 +82,23 @@ class Event(BaseModel):
     id: Optional[str] = None
     title: str
     date: str
-    recurrence_types: Optional[List[str]] = []  # ['daily', 'weekly', 'monthly']
+    recurrence_types: Optional[List[str]] = []  # ['daily', 'weekly', 'monthly', 'quarterly']
+    recurrence_until: Optional[str] = None  # Last date of the series, defaults to one year after the first
+    recurrence_count: Optional[int] = None  # Maximum occurrences per recurrence type
 
 class EventUpdate(BaseModel):
     title: str
 
+class BatchOperation(BaseModel):
+    op: str  # 'create', 'update' or 'delete'
+    id: Optional[str] = None  # Event to update or delete
+    event: Optional[Event] = None  # Event to create
+    title: Optional[str] = None  # New title of an update
+    delete_all: bool = False  # Delete the whole recurrence group
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -63,7 +116,7 @@ async def login_page():
 @app.post("/api/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login endpoint"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -76,20 +129,25 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+def _add_user(db: Session, username: str, hashed_password: str) -> User:
+    """Insert a user row"""
+    db_user = User(username=username, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
 @app.post("/api/register", status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user (protected endpoint - only for admin use)"""
     # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await run_in_threadpool(get_user, db, user_data.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    db_user = User(username=user_data.username, hashed_password=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # Create new user; bcrypt runs on the password hashing pool
+    hashed_password = await get_password_hash_async(user_data.password)
+    db_user = await run_in_threadpool(_add_user, db, user_data.username, hashed_password)
     
     return {"message": "User created successfully", "username": db_user.username}
 
@@ -101,44 +159,367 @@ async def root():
     with open("templates/index.html", "r") as f:
         return f.read()
 
+def _expand_series(series_list: List[RecurrenceSeries], start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Expand recurrence series into event dictionaries within [start, end)"""
+    for series in series_list:
+        series_end = end
+        if series_end is None and series.until is None:
+            # Never expand an endless series without a window
+            series_end = series.anchor + DEFAULT_SPAN
+        generated = 0
+        for occurrence, recurrence_type in series.occurrences(start, series_end):
+            generated += 1
+            yield series.occurrence_dict(occurrence, recurrence_type)
+        metrics.record_expansion(generated)
+
+def _series_page_stream(series: RecurrenceSeries, start: Optional[datetime], end: Optional[datetime], after: Optional[PageKey]):
+    """Yield (key, event dictionary) pairs of a series' occurrences within [start, end) after a page key"""
+    if end is None and series.until is None:
+        # Never expand an endless series without a window
+        end = series.anchor + DEFAULT_SPAN
+    if after is not None and (start is None or align(start, after[0]) < after[0]):
+        # Jump straight to the cursor's date instead of expanding earlier pages again
+        start = after[0]
+    generated = 0
+    try:
+        for occurrence, recurrence_type in series.occurrences(start, end):
+            item = series.occurrence_dict(occurrence, recurrence_type)
+            key = (occurrence, item["id"])
+            if after is not None and key <= after:
+                continue
+            generated += 1
+            yield key, item
+    finally:
+        metrics.record_expansion(generated)
+
+def _events_page(db: Session, user_id: int, start: Optional[datetime], end: Optional[datetime], after: Optional[PageKey], limit: int):
+    """Get one page of a user's events within [start, end) in (date, id) order, and the next page's cursor"""
+    rows = store.stored_events(db, user_id, start, end, after=after, limit=limit + 1)
+    streams = [
+        _series_page_stream(series, start, end, after)
+        for series in store.series_in_window(db, user_id, after[0] if after else start, end)
+    ]
+    streams.append(((row.date, row.event_id), event_dict(row)) for row in rows)
+    items, next_cursor = merge_page(streams, limit)
+    metrics.record_rows(len(items))
+    return items, next_cursor
+
+def _parse_page(limit: Optional[int], cursor: Optional[str], key_types: tuple = (datetime, str)) -> Optional[tuple]:
+    """Parse pagination parameters into (after key, limit), or None for an unpaginated listing"""
+    if limit is None and cursor is None:
+        return None
+    if limit is None:
+        limit = EVENT_PAGE_SIZE
+    if not 1 <= limit <= EVENT_PAGE_SIZE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {EVENT_PAGE_SIZE_MAX}")
+    try:
+        after = decode_cursor(cursor, key_types) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after, limit
+
+def _find_occurrence(db: Session, user_id: int, event_id: str):
+    """Resolve a generated occurrence ID to (series, occurrence date, recurrence type)"""
+    parsed = parse_occurrence_id(event_id)
+    if not parsed:
+        return None
+    series_id, day = parsed
+    series = store.find_series(db, user_id, series_id)
+    if not series:
+        return None
+    day_start = datetime.combine(day, time.min)
+    for occurrence, recurrence_type in series.occurrences(day_start, day_start + timedelta(days=1)):
+        return series, occurrence, recurrence_type
+    return None
+
+def _events_changed(user_id: int, version: int, touched_months: Iterable[str]):
+    """After a write commits: drop the cached months it touched and notify the user's open streams"""
+    invalidate_months(user_id, touched_months)
+    broker.publish(user_id, version, touched_months)
+
+def _parse_until(value: str) -> datetime:
+    """Parse a series end; a bare date includes the whole day"""
+    until = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if len(value) == 10:
+        until += timedelta(days=1, microseconds=-1)
+    return until
+
+def _parse_window(start: Optional[str], end: Optional[str], month: Optional[str]):
+    """Parse range query parameters into a [start, end) window"""
+    try:
+        if month:
+            window_start = datetime.strptime(month, "%Y-%m")
+            return window_start, window_start + relativedelta(months=1)
+        window_start = datetime.fromisoformat(start.replace('Z', '+00:00')) if start else None
+        window_end = datetime.fromisoformat(end.replace('Z', '+00:00')) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD, or YYYY-MM for month")
+    if window_start and window_end and align(window_end, window_start) <= window_start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return window_start, window_end
+
+def _events_in_window(db: Session, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """Get a user's stored events and generated occurrences within [start, end)"""
+    # Column tuples only, no ORM objects or identity map entries per row
+    rows = store.stored_events(db, user_id, start, end)
+    
+    occurrences = _expand_series(store.series_in_window(db, user_id, start, end), start, end)
+    items = [event_dict(row) for row in rows] + list(occurrences)
+    metrics.record_rows(len(items))
+    return items
+
+def _json_response(response: Response, content) -> Response:
+    """Encode a listing straight to bytes, keeping the headers already set on response"""
+    return FastJSONResponse(content, headers=dict(response.headers))
+
+def _events_etag(user_id: int, version: int) -> str:
+    """Strong ETag for any event listing of a user at a given change counter"""
+    return f'"events-{user_id}-{version}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _conditional_listing(request: Request, response: Response, db: Session, user_id: int) -> Tuple[int, Optional[Response]]:
+    """Set validators on a listing response, returns the events version and a 304 if the client copy is current"""
+    # Read the version before the events: a write in between only makes the ETag older than the data
+    version = get_events_version(db, user_id)
+    etag = _events_etag(user_id, version)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+        "X-Events-Cursor": str(version)  # Starting point for /api/events/changes
+    }
+    if _etag_matches(request, etag):
+        return version, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return version, None
+
 @app.get("/api/events")
-async def get_events(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    """Get all events organized by date"""
-    events = db.query(EventModel).all()
+def get_events(request: Request, response: Response, start: Optional[str] = None, end: Optional[str] = None, month: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Get events organized by date, optionally limited to [start, end) or to a month (YYYY-MM).
+    
+    With limit or cursor, returns one page {"events": [...], "next_cursor": ...}
+    in (date, id) order instead; pass next_cursor back until it is null.
+    """
+    window_start, window_end = _parse_window(start, end, month)
+    page = _parse_page(limit, cursor)
+    version, not_modified = _conditional_listing(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    
+    if page is not None:
+        items, next_cursor = _events_page(db, current_user.id, window_start, window_end, *page)
+        return _json_response(response, {"events": items, "next_cursor": next_cursor})
+    
+    # Month views are served from the cache while the events version they were read at is current
+    month_key = window_start.strftime("%Y-%m") if month else None
+    if month_key:
+        cached = get_month(current_user.id, month_key, version)
+        if cached is not None:
+            return _json_response(response, cached)
     
     # Group events by date
     events_by_date: Dict[str, List[dict]] = {}
-    for event in events:
-        date_key = event.date.strftime("%Y-%m-%d")
+    for item in _events_in_window(db, current_user.id, window_start, window_end):
+        date_key = item["date"][:10]
         if date_key not in events_by_date:
             events_by_date[date_key] = []
-        events_by_date[date_key].append(event.to_dict())
+        events_by_date[date_key].append(item)
+    
+    if month_key:
+        set_month(current_user.id, month_key, version, events_by_date)
+    return _json_response(response, events_by_date)
+
+@app.get("/api/events/changes")
+def get_event_changes(since: str = "0", current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Get stored events, series and deletions changed after a sync cursor.
+    
+    Clients apply `deleted` first, then `events` and `series`, and pass the
+    returned `cursor` as `since` next time.
+    """
+    try:
+        since_version = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Changes up to the version read first are fully committed, later ones are left for the next sync
+    cursor = get_events_version(db, current_user.id)
+    if since_version > cursor:
+        raise HTTPException(status_code=410, detail="Cursor is no longer valid, reload all events")
+    
+    events, series_list, tombstones = store.changes(db, current_user.id, since_version, cursor)
+    
+    return FastJSONResponse({
+        "cursor": str(cursor),
+        "events": [event_dict(row) for row in events],
+        "series": [series.to_dict() for series in series_list],
+        "deleted": [{"id": tombstone.event_id, "type": tombstone.kind} for tombstone in tombstones]
+    })
+
+async def _change_frames(user_id: int):
+    """Server-Sent Events frames of a user's change messages, until the response is cancelled by a disconnect"""
+    queue = broker.subscribe(user_id)
+    try:
+        # Tell EventSource how soon to reconnect after the connection drops
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+                continue
+            yield format_message(message)
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+@app.post("/api/events/stream/token")
+async def create_event_stream_url(request: Request, current_user: CurrentUser = Depends(get_current_active_user)):
+    """Create a short-lived URL for the user's event stream"""
+    token = create_stream_token(current_user.username)
+    return {"url": str(request.url_for("stream_event_changes").include_query_params(token=token)), "token": token}
+
+@app.get("/api/events/stream")
+async def stream_event_changes(current_user: CurrentUser = Depends(get_stream_user)):
+    """Push a message with the new sync cursor and touched months whenever the user's events change.
+    
+    Authenticated with a stream token in ?token=, since EventSource can't send
+    headers. Clients fetch the changes themselves from /api/events/changes.
+    """
+    return StreamingResponse(
+        _change_frames(current_user.id),
+        media_type="text/event-stream",
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/events/summary")
+def get_event_summary(request: Request, response: Response, start: Optional[str] = None, end: Optional[str] = None, month: Optional[str] = None, granularity: str = "day", current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Count events per day, week or month within [start, end) or a month, for overview screens"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    window_start, window_end = _parse_window(start, end, month)
+    if window_start is None or window_end is None:
+        raise HTTPException(status_code=400, detail="Specify start and end, or month")
+    version, not_modified = _conditional_listing(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    
+    counts = summarize(db, current_user.id, window_start, window_end, granularity)
+    return _json_response(response, {"granularity": granularity, "counts": counts, "total": sum(counts.values())})
+
+@app.get("/api/events/search")
+def search_events(request: Request, response: Response, q: str = "", limit: Optional[int] = None, cursor: Optional[str] = None, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Search event titles for every word of q, best matches first.
+    
+    Returns a page of stored events and next_cursor like paginated listings,
+    plus the matching recurrence series on the first page.
+    """
+    terms = q.lower().split()
+    if not terms:
+        raise HTTPException(status_code=400, detail="q is required")
+    if len(q) > 200:
+        raise HTTPException(status_code=400, detail="q must be at most 200 characters")
+    after, limit = _parse_page(limit, cursor, (int, datetime, str)) or (None, EVENT_PAGE_SIZE)
+    version, not_modified = _conditional_listing(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    
+    rows = store.search_events(db, current_user.id, terms, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor((last.rank, last.date, last.event_id))
+    series_list = store.search_series(db, current_user.id, terms) if after is None else []
+    metrics.record_rows(min(len(rows), limit))
+    return _json_response(response, {
+        "events": [event_dict(row) for row in rows[:limit]],
+        "series": [series.to_dict() for series in series_list],
+        "next_cursor": next_cursor
+    })
+
+@app.get("/api/events/export")
+def export_user_events(format: str = "ndjson", start: Optional[str] = None, end: Optional[str] = None, month: Optional[str] = None, current_user: CurrentUser = Depends(get_current_active_user)):
+    """Stream events as NDJSON, CSV or iCalendar, optionally limited to [start, end) or a month"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    window_start, window_end = _parse_window(start, end, month)
+    media_type, extension = EXPORT_FORMATS[format]
+    
+    def stream():
+        # Request-scoped sessions close before a streamed body is sent, so the export owns its session
+        db = SessionLocal()
+        try:
+            yield from export_events(db, current_user.id, format, window_start, window_end)
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="events.{extension}"'}
+    )
+
+def _import_body(body, import_format: str, user_id: int, db: Session) -> dict:
+    """Run an import from a buffered request body and commit it"""
+    touched_months = set()
+    try:
+        lines = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        result = import_events(db, user_id, lines, import_format, touched_months)
+        db.commit()
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Import must be UTF-8 encoded")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return events_by_date
+    _events_changed(user_id, get_events_version(db, user_id), touched_months)
+    return result
+
+@app.post("/api/events/import")
+async def import_user_events(request: Request, format: str = "ndjson", current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Bulk import events from an NDJSON, CSV or iCalendar request body, skipping IDs that already exist"""
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(IMPORT_FORMATS)}")
+    
+    # Buffer the body as it arrives, then parse and insert it line by line in a worker thread
+    body = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE)
+    try:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        return await run_in_threadpool(_import_body, body, format, current_user.id, db)
+    finally:
+        body.close()
 
 @app.get("/api/events/{date}")
-async def get_events_by_date(date: str, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    """Get events for a specific date"""
+def get_events_by_date(date: str, request: Request, response: Response, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Get events for a specific date, paginated like GET /api/events when limit or cursor is given"""
     try:
         # Parse date string
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    # Query events for the specific date
-    events = db.query(EventModel).filter(
-        and_(
-            extract('year', EventModel.date) == target_date.year,
-            extract('month', EventModel.date) == target_date.month,
-            extract('day', EventModel.date) == target_date.day
-        )
-    ).all()
+    page = _parse_page(limit, cursor)
+    version, not_modified = _conditional_listing(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
     
-    return [event.to_dict() for event in events]
+    day_start = datetime.combine(target_date, time.min)
+    if page is not None:
+        items, next_cursor = _events_page(db, current_user.id, day_start, day_start + timedelta(days=1), *page)
+        return _json_response(response, {"events": items, "next_cursor": next_cursor})
+    return _json_response(response, _events_in_window(db, current_user.id, day_start, day_start + timedelta(days=1)))
 
-@app.post("/api/events/{date}")
-async def create_event(date: str, event: Event, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    """Create a new event with optional recurrence"""
+def _parse_new_event(date: str, event: Event):
+    """Validate a new event, returns (event date, last occurrence of a series or None, recurrence types)"""
     try:
         # Parse date string to ensure it's valid
         event_date = datetime.strptime(date, "%Y-%m-%d")
@@ -146,130 +527,344 @@ async def create_event(date: str, event: Event, current_user: User = Depends(get
         # If event.date is provided, use it; otherwise use the date from URL
         if event.date:
             event_date = datetime.fromisoformat(event.date.replace('Z', '+00:00'))
+        until = _parse_until(event.recurrence_until) if event.recurrence_until else None
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
+    # Dates without an offset are UTC, as they are stored; responses always carry the offset
+    if event_date.tzinfo is None:
+        event_date = event_date.replace(tzinfo=timezone.utc)
     
-    # Generate ID if not provided
-    if not event.id:
-        event.id = str(int(datetime.now().timestamp() * 1000))
+    # Keep the order of the selected types, it decides which type owns shared dates
+    recurrence_types = list(dict.fromkeys(event.recurrence_types or []))
+    unknown = [t for t in recurrence_types if t not in RECURRENCE_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown recurrence type(s): {', '.join(unknown)}")
+    if event.recurrence_count is not None and not 1 <= event.recurrence_count <= RECURRENCE_MAX_COUNT:
+        raise HTTPException(status_code=400, detail=f"recurrence_count must be between 1 and {RECURRENCE_MAX_COUNT}")
+    if not recurrence_types:
+        return event_date, None, recurrence_types
     
-    created_events = []
+    try:
+        # Without an explicit end, repeat for the next year
+        if until is not None:
+            until = align(until, event_date)
+        elif event.recurrence_count is None:
+            until = event_date + DEFAULT_SPAN
+        until = last_occurrence(event_date, recurrence_types, until, event.recurrence_count)
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Series ends after the last supported date")
+    # The first date is always an occurrence, so a series ending later has at least one
+    if until < event_date:
+        raise HTTPException(status_code=400, detail="recurrence_until is before the event date")
+    # Series are expanded on every read, so their length is bounded
+    if until - event_date > timedelta(days=RECURRENCE_MAX_SPAN_DAYS):
+        raise HTTPException(status_code=400, detail=f"A series may span at most {RECURRENCE_MAX_SPAN_DAYS} days")
+    return event_date, until, recurrence_types
+
+def _insert_single_events(db: Session, user_id: int, version: int, items: List[tuple], touched_months: set) -> List[dict]:
+    """Insert non-recurring (event, date) pairs with one INSERT ... RETURNING, returns their dictionaries"""
+    touched_months.update(event_date.strftime("%Y-%m") for _, event_date in items)
+    return insert_events(db, [
+        {
+            "event_id": event.id,
+            "user_id": user_id,
+            "title": event.title,
+            "date": event_date,
+            "change_version": version
+        }
+        for event, event_date in items
+    ])
+
+def _add_series(db: Session, user_id: int, version: int, event: Event, event_date: datetime, until: Optional[datetime], recurrence_types: List[str], touched_months: set):
+    """Store a recurrence rule ending at until, returns a preview of its first occurrences and their total"""
+    # Store the rule only; occurrences are generated at query time
+    series = RecurrenceSeries(
+        series_id=event.id,
+        user_id=user_id,
+        title=event.title,
+        anchor=event_date,
+        recurrence_types=",".join(recurrence_types),
+        until=until,
+        count=event.recurrence_count,
+        exceptions=[],
+        change_version=version
+    )
+    db.add(series)
+    touched_months.update(series_months(series))
+    preview = [series.occurrence_dict(o, t) for o, t in islice(series.occurrences(), 10)]
+    return preview, count_occurrences(event_date, recurrence_types, until, event.recurrence_count)
+
+def _update_event(db: Session, user_id: int, version: int, event_id: str, title: str, touched_months: set) -> EventModel:
+    """Rename a stored event, or detach a generated occurrence from its series and rename it"""
+    # Find event by event_id
+    db_event = store.find_event(db, user_id, event_id)
     
-    # If no recurrence, create single event
-    if not event.recurrence_types:
+    if not db_event:
+        found = _find_occurrence(db, user_id, event_id)
+        if not found:
+            raise HTTPException(status_code=404, detail="Event not found")
+        
+        # Detach the occurrence from its series so it can be edited on its own
+        series, occurrence, recurrence_type = found
+        series.exceptions = list(series.exceptions or []) + [occurrence.date().isoformat()]
+        series.change_version = version
         db_event = EventModel(
-            event_id=event.id,
-            title=event.title,
-            date=event_date
+            event_id=event_id,
+            user_id=user_id,
+            title=series.title,
+            date=occurrence,
+            recurrence_type=recurrence_type,
+            recurrence_group_id=series.series_id
         )
         db.add(db_event)
-        created_events.append(db_event)
-    else:
-        # Generate a group ID for all recurring events
-        group_id = str(uuid.uuid4())
-        
-        # Track dates to avoid duplicates when multiple recurrence types are selected
-        created_dates = set()
-        
-        # Create events for each recurrence type
-        for recurrence_type in event.recurrence_types:
-            # Create events for the next year
-            current_date = event_date
-            end_date = event_date + timedelta(days=365)
-            
-            while current_date <= end_date:
-                # Only create event if we haven't already created one for this date
-                if current_date not in created_dates:
-                    # Generate unique ID for each occurrence
-                    event_id = f"{event.id}_{int(current_date.timestamp() * 1000)}_{recurrence_type}"
-                    
-                    db_event = EventModel(
-                        event_id=event_id,
-                        title=event.title,
-                        date=current_date,
-                        recurrence_type=recurrence_type,
-                        recurrence_group_id=group_id
-                    )
-                    db.add(db_event)
-                    created_events.append(db_event)
-                    created_dates.add(current_date)
-                
-                # Calculate next occurrence
-                if recurrence_type == 'daily':
-                    current_date += timedelta(days=1)
-                elif recurrence_type == 'weekly':
-                    current_date += timedelta(weeks=1)
-                elif recurrence_type == 'monthly':
-                    current_date += relativedelta(months=1)
-                elif recurrence_type == 'quarterly':
-                    current_date += relativedelta(months=3)
     
+    # Update event
+    db_event.title = title
+    db_event.change_version = version
+    touched_months.add(db_event.date.strftime("%Y-%m"))
+    return db_event
+
+def _delete_event(db: Session, user_id: int, version: int, event_id: str, delete_all: bool, touched_months: set) -> int:
+    """Delete an event, a generated occurrence or its whole recurrence group, returns the count"""
+    # Find event by event_id, or the series a generated occurrence belongs to
+    db_event = store.find_event(db, user_id, event_id)
+    series = None
+    
+    if not db_event:
+        found = _find_occurrence(db, user_id, event_id)
+        if not found:
+            raise HTTPException(status_code=404, detail="Event not found")
+        series, occurrence, _ = found
+    
+    group_id = db_event.recurrence_group_id if db_event else series.series_id
+    
+    # If delete_all is True and event is part of a recurrence group, delete all
+    if delete_all and group_id:
+        return bulk_delete(db, user_id, version, touched_months, group_id=group_id)
+    if db_event:
+        # Delete only this event
+        touched_months.add(db_event.date.strftime("%Y-%m"))
+        db.add(EventTombstone(user_id=user_id, event_id=db_event.event_id, kind="event", change_version=version))
+        db.delete(db_event)
+        return 1
+    # Skip this occurrence of the series
+    touched_months.add(occurrence.strftime("%Y-%m"))
+    series.exceptions = list(series.exceptions or []) + [occurrence.date().isoformat()]
+    series.change_version = version
+    return 1
+
+def _parse_operation(operation: BatchOperation):
+    """Validate a batch operation, returns _parse_new_event's result for creates"""
+    if operation.op == "create":
+        if operation.event is None:
+            raise HTTPException(status_code=400, detail="A create needs an event")
+        # Ids from the single-event endpoint are timestamps, which would collide within a batch
+        if not operation.event.id:
+            operation.event.id = uuid4().hex
+        # The day part of the event's own date stands in for the {date} path segment
+        return _parse_new_event(operation.event.date[:10], operation.event)
+    if operation.op not in ("update", "delete"):
+        raise HTTPException(status_code=400, detail=f"Unknown operation: {operation.op}")
+    if not operation.id:
+        raise HTTPException(status_code=400, detail=f"An {operation.op} needs an id")
+    if operation.op == "update" and operation.title is None:
+        raise HTTPException(status_code=400, detail="An update needs a title")
+    return None
+
+def _flush_creates(db: Session, user_id: int, version: int, pending: List[tuple], results: list, touched_months: set):
+    """Insert buffered single-event creates with one statement and record their results"""
+    _insert_single_events(db, user_id, version, [(event, event_date) for _, event, event_date in pending], touched_months)
+    for index, event, _ in pending:
+        results[index] = {"op": "create", "id": event.id, "created": 1}
+    pending.clear()
+
+@app.post("/api/events/batch")
+def batch_events(batch: BatchRequest, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Apply an ordered list of creates, updates and deletes in one transaction.
+    
+    Either every operation is applied or none: the first failing one rolls
+    back the batch, and the error detail carries its index. Runs of
+    consecutive single-event creates are inserted with one statement.
+    """
+    operations = batch.operations
+    if not 1 <= len(operations) <= BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"A batch holds 1 to {BATCH_MAX_OPERATIONS} operations")
+    
+    # Validate every operation before touching the database
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append(_parse_operation(operation))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail={"index": index, "error": e.detail})
+    
+    results = [None] * len(operations)
+    pending = []  # (index, event, date) of single-event creates not inserted yet
+    touched_months = set()
+    failed = 0  # Index of the operation being applied, for the error detail
+    try:
+        version = bump_events_version(db, current_user.id)
+        for index, (operation, new_event) in enumerate(zip(operations, parsed)):
+            if operation.op == "create" and not new_event[2]:
+                pending.append((index, operation.event, new_event[0]))
+                continue
+            if pending:
+                failed = pending[0][0]
+                _flush_creates(db, current_user.id, version, pending, results, touched_months)
+            failed = index
+            if operation.op == "create":
+                event_date, until, recurrence_types = new_event
+                _, total = _add_series(db, current_user.id, version, operation.event, event_date, until, recurrence_types, touched_months)
+                results[index] = {"op": "create", "id": operation.event.id, "created": total}
+            elif operation.op == "update":
+                db_event = _update_event(db, current_user.id, version, operation.id, operation.title, touched_months)
+                results[index] = {"op": "update", "id": operation.id, "event": db_event.to_dict()}
+            else:
+                deleted_count = _delete_event(db, current_user.id, version, operation.id, operation.delete_all, touched_months)
+                results[index] = {"op": "delete", "id": operation.id, "deleted": deleted_count}
+            # Flush each operation on its own, so constraint errors carry its index and
+            # later lookups (queries don't autoflush) see its changes
+            db.flush()
+        if pending:
+            failed = pending[0][0]
+            _flush_creates(db, current_user.id, version, pending, results, touched_months)
+        db.commit()
+    except HTTPException as e:
+        db.rollback()
+        raise HTTPException(status_code=e.status_code, detail={"index": failed, "error": e.detail})
+    except IntegrityError:
+        db.rollback()
+        # Ids are the only unique values a client chooses; don't echo the statement
+        raise HTTPException(status_code=400, detail={"index": failed, "error": "An event with this id already exists"})
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail={"index": failed, "error": str(e)})
+    
+    _events_changed(current_user.id, version, touched_months)
+    
+    return {"results": results, "cursor": str(version)}
+
+@app.post("/api/events/{date}")
+def create_event(date: str, event: Event, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Create a new event, or a recurrence series expanded when events are read"""
+    event_date, until, recurrence_types = _parse_new_event(date, event)
+    
+    # Generate ID if not provided
+    if not event.id:
+        event.id = str(int(datetime.now().timestamp() * 1000))
+    
+    touched_months = set()
     try:
+        version = bump_events_version(db, current_user.id)
+        
+        # If no recurrence, create single event with one INSERT ... RETURNING
+        if not recurrence_types:
+            preview = _insert_single_events(db, current_user.id, version, [(event, event_date)], touched_months)
+            total = 1
+        else:
+            preview, total = _add_series(db, current_user.id, version, event, event_date, until, recurrence_types, touched_months)
         db.commit()
-        for event in created_events:
-            db.refresh(event)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     
+    _events_changed(current_user.id, version, touched_months)
+    
     return {
-        "message": f"Created {len(created_events)} event(s)",
-        "events": [e.to_dict() for e in created_events[:10]],  # Return first 10 for preview
-        "total": len(created_events)
+        "message": f"Created {total} event(s)",
+        "events": preview,  # Return first 10 for preview
+        "total": total
     }
 
 @app.put("/api/events/{date}/{event_id}")
-async def update_event(date: str, event_id: str, event_update: EventUpdate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def update_event(date: str, event_id: str, event_update: EventUpdate, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
     """Update an existing event"""
-    # Find event by event_id
-    db_event = db.query(EventModel).filter(EventModel.event_id == event_id).first()
-    
-    if not db_event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Update event
-    db_event.title = event_update.title
-    
+    touched_months = set()
     try:
+        version = bump_events_version(db, current_user.id)
+        db_event = _update_event(db, current_user.id, version, event_id, event_update.title, touched_months)
         db.commit()
         db.refresh(db_event)
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     
+    _events_changed(current_user.id, version, touched_months)
+    
     return {"message": "Event updated", "event": db_event.to_dict()}
 
 @app.delete("/api/events/{date}/{event_id}")
-async def delete_event(date: str, event_id: str, delete_all: bool = False, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def delete_event(date: str, event_id: str, delete_all: bool = False, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
     """Delete an event or all events in a recurrence group"""
-    # Find event by event_id
-    db_event = db.query(EventModel).filter(EventModel.event_id == event_id).first()
-    
-    if not db_event:
-        raise HTTPException(status_code=404, detail="Event not found")
+    touched_months = set()
+    try:
+        version = bump_events_version(db, current_user.id)
+        deleted_count = _delete_event(db, current_user.id, version, event_id, delete_all, touched_months)
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     
-    deleted_count = 0
+    _events_changed(current_user.id, version, touched_months)
     
-    # If delete_all is True and event is part of a recurrence group, delete all
-    if delete_all and db_event.recurrence_group_id:
-        events_to_delete = db.query(EventModel).filter(
-            EventModel.recurrence_group_id == db_event.recurrence_group_id
-        ).all()
-        for event in events_to_delete:
-            db.delete(event)
-            deleted_count += 1
-    else:
-        # Delete only this event
-        db.delete(db_event)
-        deleted_count = 1
+    return {"message": f"Deleted {deleted_count} event(s)"}
+
+@app.delete("/api/events")
+def delete_events(start: Optional[str] = None, end: Optional[str] = None, month: Optional[str] = None, recurrence_group_id: Optional[str] = None, title: Optional[str] = None, current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """Delete events by date range or month, recurrence group and/or exact title"""
+    window_start, window_end = _parse_window(start, end, month)
+    if window_start is None and window_end is None and recurrence_group_id is None and title is None:
+        raise HTTPException(status_code=400, detail="Specify start, end, month, recurrence_group_id or title")
     
+    touched_months = set()
     try:
+        version = bump_events_version(db, current_user.id)
+        deleted_count = bulk_delete(db, current_user.id, version, touched_months, window_start, window_end, recurrence_group_id, title)
         db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     
-    return {"message": f"Deleted {deleted_count} event(s)"}
+    _events_changed(current_user.id, version, touched_months)
+    
+    return {"message": f"Deleted {deleted_count} event(s)", "deleted": deleted_count}
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus metrics, protected by METRICS_TOKEN when it is set"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/calendar/feed-token")
+async def create_calendar_feed_url(request: Request, current_user: CurrentUser = Depends(get_current_active_user)):
+    """Create a subscription URL for the user's calendar feed"""
+    token = create_feed_token(current_user.username)
+    return {"url": str(request.url_for("calendar_feed").include_query_params(token=token)), "token": token}
+
+@app.get("/calendar.ics")
+def calendar_feed(request: Request, current_user: CurrentUser = Depends(get_feed_user), db: Session = Depends(get_db)):
+    """iCalendar feed of the user's events for calendar clients, authenticated with ?token="""
+    # The rendered feed is cached per change counter, so polling an unchanged calendar costs one query
+    version = get_events_version(db, current_user.id)
+    headers = {
+        "ETag": f'"feed-{current_user.id}-{version}"',
+        "Cache-Control": "private, no-cache"
+    }
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    body = get_feed(current_user.id, version)
+    if body is None:
+        body = render_feed(db, current_user.id, f"{current_user.username}'s calendar")
+        set_feed(current_user.id, version, body)
+    return Response(body, media_type="text/calendar; charset=utf-8", headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
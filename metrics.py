@@ -0,0 +1,190 @@
+"""
+Prometheus metrics.
+
+A small in-process registry rendered in the Prometheus text exposition
+format at GET /metrics:
+
+- request latency histograms per route template, method and status
+- database queries per request, time spent in them, and query durations
+  per statement type, from SQLAlchemy cursor events on the engine
+- events returned per request and occurrences generated per series expansion
+- snapshots of the worker pools and caches, taken at scrape time
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Seconds; request and query latencies
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Counts; queries per request, rows and occurrences
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 100000)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative histogram with labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route template", ("method", "route", "status"))
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Database queries per request", ("route",), COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Time spent in database queries per request", ("route",))
+REQUEST_ROWS = Histogram("http_request_events_returned", "Events and occurrences returned per request", ("route",), COUNT_BUCKETS)
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Database query latency by statement type", ("operation",))
+EXPANSION_SIZE = Histogram("recurrence_expansion_occurrences", "Occurrences generated per series expansion", (), COUNT_BUCKETS)
+
+_METRICS = [REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, REQUEST_ROWS, QUERY_LATENCY, EXPANSION_SIZE]
+
+# name -> (help, function returning a stats dict, keys that only ever grow)
+_STATS: Dict[str, Tuple[str, Callable[[], dict], Tuple[str, ...]]] = {}
+
+def register_stats(prefix: str, help: str, collect: Callable[[], dict], counters: Sequence[str] = ()):
+    """Expose a component's stats() dict as <prefix>_<key> metrics, read at scrape time"""
+    _STATS[prefix] = (help, collect, tuple(counters))
+
+@dataclass
+class RequestStats:
+    """Work done while handling the current request"""
+    queries: int = 0
+    db_seconds: float = 0.0
+    rows: Optional[int] = None
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def record_rows(count: int):
+    """Count events returned by the current request"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.rows = (stats.rows or 0) + count
+
+def record_expansion(count: int):
+    """Record how many occurrences one series expansion generated"""
+    EXPANSION_SIZE.observe(count)
+
+def instrument_engine(engine):
+    """Time every statement executed on the engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        QUERY_LATENCY.observe(elapsed, (operation,))
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # Failed statements never reach after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and database work per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            # Label by route template, not raw path, to keep the number of series bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.observe(elapsed, (scope["method"], route, str(status_code)))
+            REQUEST_QUERIES.observe(stats.queries, (route,))
+            REQUEST_DB_TIME.observe(stats.db_seconds, (route,))
+            if stats.rows is not None:
+                REQUEST_ROWS.observe(stats.rows, (route,))
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for prefix, (help, collect, counters) in _STATS.items():
+        for key, value in collect().items():
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            kind = "counter" if key in counters else "gauge"
+            if kind == "counter" and not name.endswith("_total"):
+                name += "_total"
+            lines.append(f"# HELP {name} {help}: {key}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -5,12 +5,14 @@ Migrate existing events from events.json to PostgreSQL database
 
 import json
 import os
+import sys
 from datetime import datetime
 from sqlalchemy.orm import Session
-from database import engine, Event, init_db
+from database import engine, Event, User, bump_events_version, init_db, insert_events
+from cache import invalidate_months
 
-def migrate_events():
-    """Migrate events from events.json to PostgreSQL"""
+def migrate_events(username="admin"):
+    """Migrate events from events.json to PostgreSQL, owned by the given user"""
     
     # Initialize database
     print("Initializing database...")
@@ -34,37 +36,54 @@ def migrate_events():
     session = Session(engine)
     
     try:
+        # Imported events belong to this user
+        owner = session.query(User).filter(User.username == username).first()
+        if not owner:
+            print(f"User '{username}' not found. Create it first with create_user.py.")
+            return
+        
         # Count total events
         total_events = sum(len(events) for events in events_data.values())
-        migrated = 0
         
         print(f"Found {total_events} events to migrate...")
         
+        # Look up already migrated events with one query instead of one per event
+        all_ids = [event["id"] for events in events_data.values() for event in events]
+        existing_ids = {
+            event_id for (event_id,) in session.query(Event.event_id).filter(Event.user_id == owner.id, Event.event_id.in_(all_ids))
+        }
+        
+        # Migrated rows are one change, so ETags and delta sync pick them up
+        version = bump_events_version(session, owner.id)
+        
         # Migrate events
+        rows = []
         for date_key, events in events_data.items():
             for event in events:
                 # Check if event already exists
-                existing = session.query(Event).filter_by(event_id=event["id"]).first()
-                if existing:
+                if event["id"] in existing_ids:
                     print(f"Event {event['id']} already exists, skipping...")
                     continue
                 
                 # Parse date
                 event_date = datetime.fromisoformat(event["date"].replace('Z', '+00:00'))
                 
-                # Create new event
-                db_event = Event(
-                    event_id=event["id"],
-                    title=event["title"],
-                    date=event_date
-                )
-                
-                session.add(db_event)
-                migrated += 1
+                rows.append({
+                    "event_id": event["id"],
+                    "user_id": owner.id,
+                    "title": event["title"],
+                    "date": event_date,
+                    "change_version": version
+                })
+                existing_ids.add(event["id"])
                 print(f"Migrated event: {event['title']} on {date_key}")
         
+        # Insert new events with multi-row INSERT statements
+        migrated = len(insert_events(session, rows)) if rows else 0
+        
         # Commit changes
         session.commit()
+        invalidate_months(owner.id, {row["date"].strftime("%Y-%m") for row in rows})
         print(f"\nSuccessfully migrated {migrated} events to PostgreSQL!")
         
         # Optionally rename the old file
@@ -80,4 +99,4 @@ def migrate_events():
         session.close()
 
 if __name__ == "__main__":
-    migrate_events()
\ No newline at end of file
+    migrate_events(sys.argv[1] if len(sys.argv) > 1 else "admin")
\ No newline at end of file
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Migration script to make event and series IDs unique per user instead of
+globally, so one user's IDs never collide with another's.
+"""
+import sys
+from sqlalchemy import text
+from database import engine
+
+# table: (ID column, old unique index, new unique index)
+TABLES = {
+    "events": ("event_id", "ix_events_event_id", "ix_events_user_id_event_id"),
+    "recurrence_series": ("series_id", "ix_recurrence_series_series_id", "ix_recurrence_series_user_id_series_id"),
+}
+
+def _tables_without_owner(conn):
+    """Existing tables that don't have the user_id column from migrate_event_owner.py yet"""
+    missing = []
+    for table in TABLES:
+        columns = [row[0] for row in conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = :table
+        """), {"table": table})]
+        if columns and "user_id" not in columns:
+            missing.append(table)
+    return missing
+
+def migrate():
+    """Replace the global unique ID indexes with (user_id, ID) ones"""
+    with engine.connect() as conn:
+        # IDs become unique per owner, so the owner column has to be there first
+        missing = _tables_without_owner(conn)
+        if missing:
+            sys.exit(f"No user_id column in {', '.join(missing)} yet: run migrate_event_owner.py first (see deployment.md)")
+        
+        for table, (column, old_index, new_index) in TABLES.items():
+            # Create the new index first, so IDs stay unique per user throughout
+            conn.execute(text(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS {new_index} 
+                ON {table}(user_id, {column})
+            """))
+            conn.execute(text(f"DROP INDEX IF EXISTS {old_index}"))
+            print(f"{table}: {column} is now unique per user")
+        
+        conn.commit()
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
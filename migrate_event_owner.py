@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the owning user to events and recurrence series.
+
+Existing rows are assigned to the given user (default: admin):
+
+    python migrate_event_owner.py admin
+"""
+import sys
+from sqlalchemy import text
+from database import engine
+
+TABLES = {
+    "events": ("ix_events_user_id_date", "user_id, date"),
+    "recurrence_series": ("ix_recurrence_series_user_id_anchor", "user_id, anchor"),
+}
+
+def migrate(username="admin"):
+    """Add user_id columns and (user_id, date) indexes, and backfill the owner"""
+    with engine.connect() as conn:
+        users_table = conn.execute(text("""
+            SELECT table_name 
+            FROM information_schema.tables 
+            WHERE table_name = 'users'
+        """)).first()
+        if users_table is None:
+            sys.exit("No users table yet: run create_users_migration.py first (see deployment.md)")
+        
+        owner_id = conn.execute(
+            text("SELECT id FROM users WHERE username = :username"),
+            {"username": username}
+        ).scalar()
+        if owner_id is None:
+            print(f"User '{username}' not found. Create it first with create_user.py.")
+            return
+        
+        for table, (index_name, index_columns) in TABLES.items():
+            # Check if the table and column already exist
+            columns = [row[0] for row in conn.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = :table
+            """), {"table": table})]
+            
+            if not columns:
+                print(f"Table {table} does not exist yet, it will be created with user_id")
+                continue
+            
+            if 'user_id' not in columns:
+                conn.execute(text(f"""
+                    ALTER TABLE {table} 
+                    ADD COLUMN user_id INTEGER REFERENCES users(id)
+                """))
+                print(f"Added user_id column to {table}")
+            
+            # Assign rows without an owner
+            result = conn.execute(
+                text(f"UPDATE {table} SET user_id = :owner_id WHERE user_id IS NULL"),
+                {"owner_id": owner_id}
+            )
+            print(f"Assigned {result.rowcount} {table} row(s) to '{username}'")
+            
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN user_id SET NOT NULL"))
+            conn.execute(text(f"""
+                CREATE INDEX IF NOT EXISTS {index_name} 
+                ON {table}({index_columns})
+            """))
+            print(f"Created index {index_name}")
+        
+        conn.commit()
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate(sys.argv[1] if len(sys.argv) > 1 else "admin")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the per-user events change counter used for ETags
+and delta sync, and the change_version columns it stamps on events and series.
+The event_tombstones table is created by init_db().
+"""
+import sys
+from sqlalchemy import text
+from database import engine
+
+TABLES = ("events", "recurrence_series")
+
+def _tables_without_owner(conn):
+    """Existing tables that don't have the user_id column from migrate_event_owner.py yet"""
+    missing = []
+    for table in TABLES:
+        columns = [row[0] for row in conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = :table
+        """), {"table": table})]
+        if columns and "user_id" not in columns:
+            missing.append(table)
+    return missing
+
+def migrate():
+    """Add change tracking columns to existing tables"""
+    with engine.connect() as conn:
+        # The change_version indexes lead with the owner column
+        missing = _tables_without_owner(conn)
+        if missing:
+            sys.exit(f"No user_id column in {', '.join(missing)} yet: run migrate_event_owner.py first (see deployment.md)")
+        
+        # Check if column already exists
+        result = conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = 'users' 
+            AND column_name = 'events_version'
+        """))
+        
+        if result.first() is None:
+            conn.execute(text("""
+                ALTER TABLE users 
+                ADD COLUMN events_version INTEGER NOT NULL DEFAULT 0
+            """))
+            print("Added events_version column")
+        
+        for table in TABLES:
+            result = conn.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = :table 
+                AND column_name = 'change_version'
+            """), {"table": table})
+            
+            if result.first() is None:
+                conn.execute(text(f"""
+                    ALTER TABLE {table} 
+                    ADD COLUMN change_version INTEGER NOT NULL DEFAULT 0
+                """))
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS ix_{table}_user_id_change_version 
+                    ON {table}(user_id, change_version)
+                """))
+                print(f"Added change_version column and index to {table}")
+        
+        conn.commit()
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
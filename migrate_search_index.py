@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the trigram index behind GET /api/events/search on
+PostgreSQL. The index makes `title ILIKE '%term%'` an index lookup instead of
+a scan of every event. It is built CONCURRENTLY, so writes continue while it
+runs. SQLite databases get their search index from init_db().
+"""
+from sqlalchemy import text
+from database import engine
+
+def migrate():
+    """Enable pg_trgm and index event titles"""
+    if engine.dialect.name != "postgresql":
+        print("Nothing to do: the search index is only migrated on PostgreSQL")
+        return
+    
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_events_title_trgm 
+            ON events USING gin (title gin_trgm_ops)
+        """))
+        print("Created trigram index on events.title")
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
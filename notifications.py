@@ -0,0 +1,146 @@
+"""
+Change notifications pushed to open calendars.
+
+Every committed write publishes a small message to the user's channel:
+the new change cursor and the months it touched. Clients subscribed through
+GET /api/events/stream then fetch just the delta from /api/events/changes,
+instead of polling the event list. The broker is pluggable:
+
+- ChangeBroker fans messages out within the process, for single-node setups
+- PostgresChangeBroker sends them through LISTEN/NOTIFY, so streams served by
+  any node see writes made on every other node. LISTEN needs a session that
+  stays on one server connection, so behind a transaction pooler it listens
+  on NOTIFY_DATABASE_URL instead of DATABASE_URL.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from config import DB_TRANSACTION_POOLER, NOTIFY_BACKEND, NOTIFY_DATABASE_URL
+from database import engine
+from serialization import dumps, loads
+
+logger = logging.getLogger("notifications")
+
+# Messages buffered per stream; a slow client drops the oldest ones, which is
+# harmless because each message carries the latest cursor
+STREAM_QUEUE_SIZE = 16
+
+def _offer(queue: asyncio.Queue, message: dict):
+    """Queue a message on the queue's event loop, dropping the oldest when full"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+class ChangeBroker:
+    """In-process fan-out of change messages to the streams of each user"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Queue receiving the user's change messages; call from the event loop serving the stream"""
+        queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update([entry for entry in subscribers if entry[0] is queue])
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id: int, cursor: int, months: Iterable[str]):
+        """Announce a committed change of a user's events; safe to call from worker threads"""
+        self._deliver(user_id, {"cursor": str(cursor), "months": sorted(months)})
+
+    def _deliver(self, user_id: int, message: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                pass  # The stream's event loop has closed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"streams": sum(len(subscribers) for subscribers in self._subscribers.values())}
+
+class PostgresChangeBroker(ChangeBroker):
+    """Broker relaying messages through PostgreSQL LISTEN/NOTIFY between app nodes"""
+
+    CHANNEL = "event_changes"
+
+    def __init__(self, engine, listen_url: str = ""):
+        super().__init__()
+        self._engine = engine
+        # libpq URL of the connection held open for LISTEN
+        url = make_url(listen_url) if listen_url else engine.url
+        self._listen_url = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listener = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="change-listener", daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id: int, cursor: int, months: Iterable[str]):
+        # Delivered back to this node by the listener too, like to every other node
+        payload = dumps({"user_id": user_id, "cursor": str(cursor), "months": sorted(months)}).decode()
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(select(func.pg_notify(self.CHANNEL, payload)))
+        except Exception:
+            # The change is committed either way; open clients catch up on their next sync
+            logger.exception("Could not publish a change notification")
+
+    def _listen(self):
+        """Relay notifications to local streams from a dedicated connection, reconnecting on errors"""
+        import psycopg
+
+        while True:
+            try:
+                with psycopg.connect(self._listen_url, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {self.CHANNEL}")
+                    for notify in conn.notifies():
+                        message = loads(notify.payload)
+                        self._deliver(message.pop("user_id"), message)
+            except Exception:
+                logger.exception("Change listener lost its connection, reconnecting")
+                time.sleep(1)
+
+def create_broker(backend: str, engine, listen_url: str = "", transaction_pooler: bool = False) -> ChangeBroker:
+    """Broker for NOTIFY_BACKEND: 'postgres' for LISTEN/NOTIFY, anything else in-process"""
+    if backend == "postgres":
+        if engine.dialect.name != "postgresql":
+            raise ValueError("NOTIFY_BACKEND=postgres needs a PostgreSQL DATABASE_URL")
+        if transaction_pooler and not listen_url:
+            # LISTEN through the pooler would silently never receive anything
+            raise ValueError(
+                "NOTIFY_BACKEND=postgres can't LISTEN through the transaction pooler in DATABASE_URL; "
+                "set NOTIFY_DATABASE_URL to a direct connection (port 5432)"
+            )
+        return PostgresChangeBroker(engine, listen_url)
+    return ChangeBroker()
+
+def format_message(message: dict) -> bytes:
+    """A change message as a Server-Sent Events frame"""
+    return b"event: change\ndata: " + dumps(message) + b"\n\n"
+
+# Comment frame keeping idle streams open through proxies
+KEEPALIVE = b": keep-alive\n\n"
+
+# Broker of the configured backend
+broker = create_broker(NOTIFY_BACKEND, engine, NOTIFY_DATABASE_URL, DB_TRANSACTION_POOLER)
@@ -0,0 +1,52 @@
+"""
+Keyset pagination of event listings.
+
+Listings are ordered by (date, id), search results by (rank, date, id),
+and a cursor is the key of the last item of the previous page, so fetching
+any page starts at that key instead of skipping over earlier rows. Cursors
+are opaque to clients: URL-safe base64 of the key.
+"""
+
+import base64
+import heapq
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from serialization import dumps, loads
+
+# (date, id) of an event
+PageKey = Tuple[datetime, str]
+
+def encode_cursor(key: tuple) -> str:
+    """Opaque cursor continuing after key"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    return base64.urlsafe_b64encode(dumps(values)).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, types: Sequence[type] = (datetime, str)) -> tuple:
+    """Key of the given value types encoded in a cursor, raises ValueError if the cursor is malformed"""
+    try:
+        values = loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Invalid cursor")
+        key = tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, values)
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if any(isinstance(value, datetime) and value.tzinfo is None for value in key):
+        # Event dates are always aware; a naive key couldn't be compared with them
+        raise ValueError("Invalid cursor")
+    return key
+
+def merge_page(streams: Iterable[Iterator[Tuple[PageKey, dict]]], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """Merge (key, item) streams that are each in key order into one page.
+
+    Returns the first limit items and the cursor of the next page, or None
+    on the last page. Each stream is read at most limit + 1 items deep.
+    """
+    merged = list(islice(heapq.merge(*streams, key=itemgetter(0)), limit + 1))
+    next_cursor = encode_cursor(merged[limit - 1][0]) if len(merged) > limit else None
+    return [item for _, item in merged[:limit]], next_cursor
@@ -0,0 +1,158 @@
+"""
+Recurrence rule expansion.
+
+A recurring event is stored once as a rule (anchor date, recurrence types,
+optional end/count and exception dates) and its occurrences are generated
+lazily for whatever window is being read.
+"""
+
+import heapq
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+RECURRENCE_TYPES = ("daily", "weekly", "monthly", "quarterly")
+
+# Series created without an explicit end repeat for one year, like the
+# materialized events did before.
+DEFAULT_SPAN = timedelta(days=365)
+
+_FIXED_STEPS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+_MONTH_STEPS = {
+    "monthly": 1,
+    "quarterly": 3,
+}
+
+def align(value: datetime, reference: datetime) -> datetime:
+    """Make a window bound comparable with a (possibly tz-aware) reference datetime."""
+    if value.tzinfo is None and reference.tzinfo is not None:
+        return value.replace(tzinfo=reference.tzinfo)
+    if value.tzinfo is not None and reference.tzinfo is None:
+        return value.replace(tzinfo=None)
+    return value
+
+def occurrence_at(recurrence_type: str, anchor: datetime, index: int) -> datetime:
+    """Return the index-th occurrence of a rule, counted from the anchor."""
+    if recurrence_type in _FIXED_STEPS:
+        return anchor + _FIXED_STEPS[recurrence_type] * index
+    if recurrence_type in _MONTH_STEPS:
+        return anchor + relativedelta(months=_MONTH_STEPS[recurrence_type] * index)
+    raise ValueError(f"Unknown recurrence type: {recurrence_type}")
+
+def _first_index(recurrence_type: str, anchor: datetime, start: datetime) -> int:
+    """Return the smallest occurrence index that falls on or after start."""
+    if start <= anchor:
+        return 0
+    if recurrence_type in _FIXED_STEPS:
+        return -((anchor - start) // _FIXED_STEPS[recurrence_type])
+    months = (start.year - anchor.year) * 12 + start.month - anchor.month
+    index = max(months // _MONTH_STEPS[recurrence_type], 0)
+    while occurrence_at(recurrence_type, anchor, index) < start:
+        index += 1
+    return index
+
+def iter_rule(
+    recurrence_type: str,
+    anchor: datetime,
+    start: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+) -> Iterator[datetime]:
+    """Yield occurrences of a single rule in order, skipping straight to start."""
+    index = _first_index(recurrence_type, anchor, align(start, anchor)) if start else 0
+    if until is not None:
+        until = align(until, anchor)
+    while count is None or index < count:
+        occurrence = occurrence_at(recurrence_type, anchor, index)
+        if until is not None and occurrence > until:
+            return
+        yield occurrence
+        index += 1
+
+def _tagged(order: int, recurrence_type: str, occurrences: Iterable[datetime]):
+    for occurrence in occurrences:
+        yield occurrence, order, recurrence_type
+
+def expand(
+    anchor: datetime,
+    recurrence_types: List[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+    exceptions: Iterable[str] = (),
+) -> Iterator[Tuple[datetime, str]]:
+    """
+    Yield (occurrence, recurrence_type) pairs in [start, end), in date order.
+
+    When several recurrence types produce the same date, the occurrence is
+    reported once, attributed to the first type in recurrence_types.
+    Exceptions are 'YYYY-MM-DD' strings of dates removed from the series.
+    """
+    rules = [
+        _tagged(order, recurrence_type, iter_rule(recurrence_type, anchor, start, until, count))
+        for order, recurrence_type in enumerate(recurrence_types)
+    ]
+    if end is not None:
+        end = align(end, anchor)
+    skipped = set(exceptions)
+    previous = None
+    for occurrence, _, recurrence_type in heapq.merge(*rules):
+        if end is not None and occurrence >= end:
+            return
+        if occurrence == previous:
+            continue
+        previous = occurrence
+        if occurrence.date().isoformat() in skipped:
+            continue
+        yield occurrence, recurrence_type
+
+def last_occurrence(
+    anchor: datetime,
+    recurrence_types: List[str],
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+) -> Optional[datetime]:
+    """Return the last date a rule can produce, or None if it never ends."""
+    if count is None:
+        return until
+    last = max(occurrence_at(recurrence_type, anchor, count - 1) for recurrence_type in recurrence_types)
+    if until is not None:
+        last = min(last, align(until, anchor))
+    return last
+
+def count_occurrences(
+    anchor: datetime,
+    recurrence_types: List[str],
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+) -> int:
+    """Return how many dates a rule without exceptions produces; the rule must end."""
+    if len(recurrence_types) == 1:
+        total = count
+        if until is not None:
+            # Occurrences up to until are the indexes before the first one after it
+            within = _first_index(recurrence_types[0], anchor, align(until, anchor) + timedelta(microseconds=1))
+            total = within if total is None else min(total, within)
+        return total
+    # Several types can share dates, which expand() reports once
+    return sum(1 for _ in expand(anchor, recurrence_types, until=until, count=count))
+
+def occurrence_id(series_id: str, occurrence: datetime) -> str:
+    """Build the public ID of a generated occurrence."""
+    return f"{series_id}_{occurrence.strftime('%Y%m%d')}"
+
+def parse_occurrence_id(event_id: str) -> Optional[Tuple[str, date]]:
+    """Split an occurrence ID into its series ID and date, or return None."""
+    series_id, _, day = event_id.rpartition("_")
+    if not series_id or len(day) != 8:
+        return None
+    try:
+        return series_id, datetime.strptime(day, "%Y%m%d").date()
+    except ValueError:
+        return None
@@ -0,0 +1,42 @@
+"""
+Fast JSON encoding for API responses.
+
+FastAPI runs plain return values through jsonable_encoder, which walks every
+dict and list in Python before json.dumps runs. Event listings are already
+plain dicts of strings, so they are encoded straight to bytes instead, with
+orjson when it is installed and the standard library otherwise.
+"""
+
+import json
+from datetime import date, datetime
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+def _default(value):
+    """Encode values the standard json module doesn't know"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """Encode content as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+def loads(data):
+    """Decode JSON bytes or text"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with dumps(), bypassing jsonable_encoder when returned directly"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
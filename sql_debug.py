@@ -0,0 +1,127 @@
+"""
+Opt-in SQL debugging: N+1 detection and slow query plans.
+
+Enabled with SQL_DEBUG=true. Every statement on the engine is then:
+
+- counted per request (or per track() block in scripts). Statements that run
+  SQL_DEBUG_REPEAT_THRESHOLD or more times with the same shape (same SQL,
+  IN lists and VALUES rows collapsed) are logged as a likely N+1. The count
+  is also returned in an X-SQL-Queries response header, so tests can assert it.
+  Streamed responses (export, feed) send their headers before the body runs
+  its queries, so they go without the header; their N+1 report is still logged.
+- timed, and statements slower than SQL_DEBUG_SLOW_MS are logged with their
+  EXPLAIN plan.
+
+Executemany calls count as one statement, so batched writes aren't flagged.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger("sql_debug")
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_PLACEHOLDER_LIST = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)")
+_REPEATED_GROUPS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_tracked: ContextVar[Optional[Counter]] = ContextVar("sql_debug_tracked", default=None)
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so calls differing only in parameters or list lengths compare equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _REPEATED_GROUPS.sub("(?)", shape)
+
+def report(label: str, shapes: Counter, threshold: int):
+    """Log statement shapes of a unit of work that repeated at least threshold times"""
+    total = sum(shapes.values())
+    for shape, count in shapes.most_common():
+        if count < threshold:
+            break
+        logger.warning("Possible N+1 in %s: %d of %d statements were: %s", label, count, total, shape[:500])
+
+@contextmanager
+def track(label: str, threshold: int):
+    """Count statements run inside the block and report repeated shapes when it ends"""
+    shapes = Counter()
+    token = _tracked.set(shapes)
+    try:
+        yield shapes
+    finally:
+        _tracked.reset(token)
+        report(label, shapes, threshold)
+
+def _explain(conn, statement: str, parameters) -> str:
+    """Plan of a statement without running it, via a raw cursor so no events fire"""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join("    " + " | ".join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"    (EXPLAIN failed: {e})"
+    finally:
+        cursor.close()
+
+def instrument(engine, slow_ms: float):
+    """Attach statement counting and slow query logging to an engine"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_debug_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["sql_debug_started"].pop()) * 1000
+        shapes = _tracked.get()
+        if shapes is not None:
+            shapes[statement_shape(statement)] += 1
+        if elapsed_ms >= slow_ms:
+            plan = "" if executemany else "\n" + _explain(conn, statement, parameters)
+            logger.warning("Slow query (%.1f ms): %s%s", elapsed_ms, _WHITESPACE.sub(" ", statement)[:1000], plan)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None and context.connection.info.get("sql_debug_started"):
+            context.connection.info["sql_debug_started"].pop()
+
+class SQLDebugMiddleware:
+    """ASGI middleware tracking statements per request and reporting likely N+1 patterns"""
+
+    def __init__(self, app, threshold: int):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            # Hold the headers until the first body part shows whether the body is streamed
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is not None:
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    count = str(sum(shapes.values())).encode()
+                    start["headers"] = list(start.get("headers", [])) + [(b"x-sql-queries", count)]
+                await send(start)
+                start = None
+            await send(message)
+
+        with track(f"{scope['method']} {scope['path']}", self.threshold) as shapes:
+            await self.app(scope, receive, send_wrapper)
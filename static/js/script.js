@@ -2,6 +2,8 @@
 let currentDate = new Date();
 let selectedDate = null;
 let events = {};
+let syncCursor = null;
+let changeStream = null;
 
 // API base URL
 const API_BASE_URL = '/api';
@@ -24,14 +26,20 @@ function getAuthHeaders() {
     };
 }
 
-// Load events from API
+// Month shown in the calendar as YYYY-MM
+function visibleMonthKey() {
+    return `${currentDate.getFullYear()}-${String(currentDate.getMonth() + 1).padStart(2, '0')}`;
+}
+
+// Load events for the visible month from API
 async function loadEvents() {
     try {
-        const response = await fetch(`${API_BASE_URL}/events`, {
+        const response = await fetch(`${API_BASE_URL}/events?month=${visibleMonthKey()}`, {
             headers: getAuthHeaders()
         });
         if (response.ok) {
             events = await response.json();
+            syncCursor = response.headers.get('X-Events-Cursor');
         } else if (response.status === 401) {
             window.location.href = '/login';
         }
@@ -40,6 +48,50 @@ async function loadEvents() {
     }
 }
 
+// Apply only the changes made since the last load or sync
+async function syncEvents() {
+    if (syncCursor === null) {
+        return loadEvents();
+    }
+    try {
+        const response = await fetch(`${API_BASE_URL}/events/changes?since=${syncCursor}`, {
+            headers: getAuthHeaders()
+        });
+        if (response.status === 401) {
+            window.location.href = '/login';
+            return;
+        }
+        if (!response.ok) {
+            return loadEvents();
+        }
+        const changes = await response.json();
+        
+        // Series occurrences are generated by the server, reload the month when a series changed
+        if (changes.series.length > 0 || changes.deleted.some(d => d.type === 'series')) {
+            return loadEvents();
+        }
+        
+        // Remove deleted and changed events, then add changed events back under their date
+        const removedIds = new Set([...changes.deleted.map(d => d.id), ...changes.events.map(e => e.id)]);
+        for (const dateKey of Object.keys(events)) {
+            events[dateKey] = events[dateKey].filter(e => !removedIds.has(e.id));
+            if (events[dateKey].length === 0) {
+                delete events[dateKey];
+            }
+        }
+        const month = visibleMonthKey();
+        changes.events.forEach(event => {
+            const dateKey = event.date.slice(0, 10);
+            if (dateKey.startsWith(month)) {
+                (events[dateKey] = events[dateKey] || []).push(event);
+            }
+        });
+        syncCursor = changes.cursor;
+    } catch (error) {
+        console.error('Error syncing events:', error);
+    }
+}
+
 // Save event via API
 async function saveEvent(dateKey, eventData) {
     try {
@@ -98,22 +150,70 @@ async function deleteEventAPI(dateKey, eventId, deleteAll = false) {
     }
 }
 
+// Subscribe to change notifications, so edits from other tabs and devices show up without polling
+async function connectChangeStream() {
+    if (!getAccessToken() || !window.EventSource) {
+        return;
+    }
+    try {
+        // Stream URLs carry a short-lived token that only opens the stream
+        const response = await fetch(`${API_BASE_URL}/events/stream/token`, {
+            method: 'POST',
+            headers: getAuthHeaders()
+        });
+        if (!response.ok) {
+            return;
+        }
+        const { url } = await response.json();
+        changeStream = new EventSource(url);
+    } catch (error) {
+        console.error('Error connecting change stream:', error);
+        return;
+    }
+    
+    // Catch up on changes made while the stream was disconnected
+    changeStream.onopen = async () => {
+        await syncEvents();
+        renderCalendar();
+    };
+    // The browser retries dropped streams itself, but gives up once the token has expired
+    changeStream.onerror = () => {
+        if (changeStream.readyState === EventSource.CLOSED) {
+            setTimeout(connectChangeStream, 3000);
+        }
+    };
+    changeStream.addEventListener('change', async (message) => {
+        const change = JSON.parse(message.data);
+        // Skip changes already applied, like this tab's own edits
+        if (syncCursor !== null && Number(change.cursor) <= Number(syncCursor)) {
+            return;
+        }
+        await syncEvents();
+        renderCalendar();
+    });
+}
+
 // Initialize calendar
 async function init() {
     await loadEvents();
     renderCalendar();
     setupEventListeners();
+    connectChangeStream();
 }
 
 // Setup event listeners
 function setupEventListeners() {
-    document.getElementById('prev-month').addEventListener('click', () => {
+    document.getElementById('prev-month').addEventListener('click', async () => {
+        currentDate.setDate(1);
         currentDate.setMonth(currentDate.getMonth() - 1);
+        await loadEvents();
         renderCalendar();
     });
     
-    document.getElementById('next-month').addEventListener('click', () => {
+    document.getElementById('next-month').addEventListener('click', async () => {
+        currentDate.setDate(1);
         currentDate.setMonth(currentDate.getMonth() + 1);
+        await loadEvents();
         renderCalendar();
     });
     
@@ -400,8 +500,8 @@ async function saveEventHandler() {
         
         const response = await saveEvent(dateKey, newEvent);
         if (response) {
-            // Reload all events to show recurring events
-            await loadEvents();
+            // Fetch the changes, including new recurring events
+            await syncEvents();
             success = true;
         }
     }
@@ -435,8 +535,8 @@ async function deleteEvent() {
     const success = await deleteEventAPI(dateKey, eventId, deleteAll);
     
     if (success) {
-        // Reload all events to reflect changes
-        await loadEvents();
+        // Fetch the changes to reflect the deletion
+        await syncEvents();
         renderCalendar();
         document.getElementById('event-modal').style.display = 'none';
     } else {
@@ -0,0 +1,223 @@
+"""
+Storage backends for event queries.
+
+Request handlers, export and the calendar feed read events through an
+EventStore instead of building queries themselves. EventStore holds the
+queries that are the same on every database, and subclasses hold what
+differs per dialect. The module-level `store` is the backend of the
+configured engine:
+
+- PostgresEventStore for server deployments
+- SQLiteEventStore for single-node installs and tests, set up with
+  SQLITE_PATH; the connections are tuned in database.py (WAL, mmap, cache)
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, Date, Integer, MetaData, Table, Text, and_, case, cast, func, literal_column, or_, select, text, tuple_
+
+from database import Event, EVENT_COLUMNS, EventTombstone, RecurrenceSeries, engine
+
+# SQLite's trigram index of event titles, created by database.py; not part of the models' metadata
+_events_fts = Table("events_fts", MetaData(), Column("rowid", Integer), Column("title", Text))
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class EventStore:
+    """Event queries that work on any SQL database"""
+
+    dialect = None
+
+    def _event_id_key(self):
+        """Event IDs as ORDER BY and keyset comparisons see them.
+
+        They must sort in Python's code point order, which merge_page and the
+        series page streams compare IDs in; SQLite's default BINARY collation does.
+        """
+        return Event.event_id
+
+    def stored_events(
+        self,
+        db,
+        user_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        yield_per: Optional[int] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+    ):
+        """Rows of EVENT_COLUMNS of a user's stored events within [start, end), in (date, id) order.
+
+        after is a (date, id) key to continue after, for keyset pagination.
+        """
+        # Plain range predicates so the lookup is a range scan on the (user_id, date) index
+        query = select(*EVENT_COLUMNS).where(Event.user_id == user_id)
+        if start is not None:
+            query = query.where(Event.date >= start)
+        if end is not None:
+            query = query.where(Event.date < end)
+        if after is not None:
+            after_date, after_id = after
+            # The range bound starts the index scan at the cursor, the OR only filters ties on its date
+            query = query.where(Event.date >= after_date, or_(Event.date > after_date, self._event_id_key() > after_id))
+        query = query.order_by(Event.date, self._event_id_key())
+        if limit is not None:
+            query = query.limit(limit)
+        if yield_per:
+            query = query.execution_options(yield_per=yield_per)
+        return db.execute(query)
+
+    def series_in_window(self, db, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None, query=None) -> List[RecurrenceSeries]:
+        """A user's recurrence series that may have occurrences within [start, end)"""
+        if query is None:
+            query = db.query(RecurrenceSeries)
+        query = query.filter(RecurrenceSeries.user_id == user_id)
+        if end is not None:
+            query = query.filter(RecurrenceSeries.anchor < end)
+        if start is not None:
+            query = query.filter(or_(RecurrenceSeries.until.is_(None), RecurrenceSeries.until >= start))
+        return query.all()
+
+    def find_event(self, db, user_id: int, event_id: str) -> Optional[Event]:
+        """A stored event owned by the user"""
+        return db.query(Event).filter(Event.user_id == user_id, Event.event_id == event_id).first()
+
+    def find_series(self, db, user_id: int, series_id: str) -> Optional[RecurrenceSeries]:
+        """A recurrence series owned by the user"""
+        return db.query(RecurrenceSeries).filter(RecurrenceSeries.user_id == user_id, RecurrenceSeries.series_id == series_id).first()
+
+    def changes(self, db, user_id: int, since: int, cursor: int) -> Tuple[list, List[RecurrenceSeries], List[EventTombstone]]:
+        """Event rows, series and tombstones changed in (since, cursor], in change order"""
+
+        def changed(model):
+            return and_(model.user_id == user_id, model.change_version > since, model.change_version <= cursor)
+
+        events = db.execute(select(*EVENT_COLUMNS).where(changed(Event)).order_by(Event.change_version)).all()
+        series_list = db.query(RecurrenceSeries).filter(changed(RecurrenceSeries)).order_by(RecurrenceSeries.change_version).all()
+        tombstones = db.query(EventTombstone).filter(changed(EventTombstone)).order_by(EventTombstone.change_version).all()
+        return events, series_list, tombstones
+
+    def count_events(self, db, user_id: int, start: datetime, end: datetime, granularity: str) -> Dict[str, int]:
+        """Number of a user's stored events within [start, end) per period, keyed by the period's first day.
+
+        Periods are UTC days, weeks starting on Monday, or months.
+        """
+        period = self._period(granularity).label("period")
+        query = (
+            select(period, func.count())
+            .where(Event.user_id == user_id, Event.date >= start, Event.date < end)
+            .group_by(period)
+        )
+        return {self._period_key(value): count for value, count in db.execute(query)}
+
+    def _period(self, granularity: str):
+        """SQL expression of the first day of the period an event falls in"""
+        raise NotImplementedError(f"Event summaries are not supported on {self.dialect or 'this database'}")
+
+    def _period_key(self, value) -> str:
+        return value.isoformat()
+
+    def search_events(self, db, user_id: int, terms: List[str], after: Optional[Tuple[int, datetime, str]] = None, limit: int = 20):
+        """Rows of EVENT_COLUMNS plus a rank of a user's stored events whose title contains every term.
+
+        Terms are lowercase. Best matches come first: rank 0 is the whole
+        title, 1 a title prefix, 2 a word prefix, 3 anywhere; ties are in
+        (date, id) order. after is a (rank, date, id) key to continue after.
+        """
+        phrase = " ".join(terms)
+        title = func.lower(Event.title)
+        rank = case(
+            (title == phrase, 0),
+            (title.startswith(phrase, autoescape=True), 1),
+            (title.contains(" " + phrase, autoescape=True), 2),
+            else_=3,
+        )
+        query = select(*EVENT_COLUMNS, rank.label("rank")).where(Event.user_id == user_id, *self._titles_contain(db, terms))
+        event_id = self._event_id_key()
+        if after is not None:
+            query = query.where(tuple_(rank, Event.date, event_id) > tuple_(*after))
+        return db.execute(query.order_by(rank, Event.date, event_id).limit(limit)).all()
+
+    def search_series(self, db, user_id: int, terms: List[str]) -> List[RecurrenceSeries]:
+        """A user's recurrence series whose title contains every term, in anchor order"""
+        title = func.lower(RecurrenceSeries.title)
+        return (
+            db.query(RecurrenceSeries)
+            .filter(RecurrenceSeries.user_id == user_id, *[title.contains(term, autoescape=True) for term in terms])
+            .order_by(RecurrenceSeries.anchor)
+            .all()
+        )
+
+    def _titles_contain(self, db, terms: List[str]) -> list:
+        """Conditions that an event title contains every lowercase term"""
+        return [func.lower(Event.title).contains(term, autoescape=True) for term in terms]
+
+    def optimize(self, db):
+        """Database maintenance run at startup"""
+
+class PostgresEventStore(EventStore):
+    """PostgreSQL backend; autovacuum keeps planner statistics current"""
+
+    dialect = "postgresql"
+
+    def _event_id_key(self):
+        # Byte order, whatever the database's collation; in UTF-8 that is code point order
+        return Event.event_id.collate("C")
+
+    def _titles_contain(self, db, terms: List[str]) -> list:
+        # ILIKE '%term%' can use the pg_trgm index from migrate_search_index.py
+        return [Event.title.ilike(f"%{_escape_like(term)}%", escape="\\") for term in terms]
+
+    def _period(self, granularity: str):
+        # date_trunc of a timestamptz works in the session time zone, so convert to UTC first
+        return cast(func.date_trunc(granularity, func.timezone("UTC", Event.date)), Date)
+
+class SQLiteEventStore(EventStore):
+    """Embedded SQLite backend for single-node installs and tests"""
+
+    dialect = "sqlite"
+
+    # date() modifiers from a stored UTC timestamp to the first day of its period
+    _PERIOD_MODIFIERS = {
+        "day": (),
+        "week": ("-6 days", "weekday 1"),  # The Monday on or before the date
+        "month": ("start of month",),
+    }
+
+    def _period(self, granularity: str):
+        return func.date(Event.date, *self._PERIOD_MODIFIERS[granularity])
+
+    def __init__(self):
+        self._has_search_index = None
+
+    def _period_key(self, value) -> str:
+        return value  # date() already returns YYYY-MM-DD
+
+    def _titles_contain(self, db, terms: List[str]) -> list:
+        if self._has_search_index is None:
+            self._has_search_index = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'events_fts'")).first() is not None
+        # Trigrams can't match terms shorter than three characters
+        indexed = [term for term in terms if len(term) >= 3] if self._has_search_index else []
+        conditions = super()._titles_contain(db, [term for term in terms if term not in indexed])
+        if indexed:
+            # Quoted FTS5 phrases of trigrams match anywhere in the title, case-insensitively.
+            # One MATCH for all terms lets FTS5 intersect them instead of one subquery per term.
+            expression = " AND ".join('"' + term.replace('"', '""') + '"' for term in indexed)
+            conditions.append(Event.id.in_(select(_events_fts.c.rowid).where(literal_column("events_fts").match(expression))))
+        return conditions
+
+    def optimize(self, db):
+        # Gathers statistics for indexes that need them, so the planner picks the (user_id, date) indexes
+        db.execute(text("PRAGMA optimize"))
+        db.commit()
+
+_STORES = {store_class.dialect: store_class for store_class in (PostgresEventStore, SQLiteEventStore)}
+
+def create_store(dialect: str) -> EventStore:
+    """Event store for a SQLAlchemy dialect name, falling back to the portable queries"""
+    return _STORES.get(dialect, EventStore)()
+
+# Store of the configured engine
+store = create_store(engine.dialect.name)
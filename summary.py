@@ -0,0 +1,36 @@
+"""
+Event counts per day, week or month for overview screens.
+
+Stored events are counted by the database with one GROUP BY over the
+(user_id, date) index. Recurrence series are expanded for the window and
+counted in the same periods: UTC days, weeks starting on Monday, months.
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict
+
+import metrics
+from storage import store
+
+GRANULARITIES = ("day", "week", "month")
+
+def period_start(value: datetime, granularity: str) -> date:
+    """First day of the period a datetime falls in"""
+    day = value.astimezone(timezone.utc).date() if value.tzinfo is not None else value.date()
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def summarize(db, user_id: int, start: datetime, end: datetime, granularity: str) -> Dict[str, int]:
+    """Number of a user's events and occurrences within [start, end) per period, in date order"""
+    counts = Counter(store.count_events(db, user_id, start, end, granularity))
+    for series in store.series_in_window(db, user_id, start, end):
+        generated = 0
+        for occurrence, _ in series.occurrences(start, end):
+            counts[period_start(occurrence, granularity).isoformat()] += 1
+            generated += 1
+        metrics.record_expansion(generated)
+    return dict(sorted(counts.items()))
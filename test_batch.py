@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Test that a failing batch operation is reported with its own index"""
+
+import os
+import subprocess
+import sys
+
+# Settings are read at import time, so the app runs in a fresh interpreter
+REQUEST_SCRIPT = """
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_password_hash
+from database import SessionLocal, User
+
+with TestClient(main.app) as client:
+    db = SessionLocal()
+    db.add(User(username="batch", hashed_password=get_password_hash("secret")))
+    db.commit()
+    db.close()
+    response = client.post("/api/login", data={"username": "batch", "password": "secret"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    series = {"id": "S", "title": "Series", "date": "2025-03-01T09:00:00Z", "recurrence_types": ["weekly"], "recurrence_count": 3}
+    single = {"id": "one", "title": "One", "date": "2025-03-02T09:00:00Z"}
+    response = client.post("/api/events/batch", json={"operations": [
+        {"op": "create", "event": series},
+        {"op": "create", "event": single},
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+
+    # Series "S" exists already: the error belongs to the create, not to the update after it
+    response = client.post("/api/events/batch", json={"operations": [
+        {"op": "create", "event": series},
+        {"op": "update", "id": "one", "title": "Renamed"},
+    ]}, headers=headers)
+    assert response.status_code == 400, response.text
+    detail = response.json()["detail"]
+    assert detail["index"] == 0, detail
+    assert "INSERT" not in detail["error"], detail
+
+    # Nothing of the failed batch was applied
+    response = client.get("/api/events?month=2025-03", headers=headers)
+    titles = [event["title"] for events in response.json().values() for event in events]
+    assert "Renamed" not in titles and "One" in titles, titles
+"""
+
+def test_failed_operation_index():
+    env = dict(os.environ, DATABASE_URL="sqlite://", NOTIFY_BACKEND="memory")
+    result = subprocess.run(
+        [sys.executable, "-c", REQUEST_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+if __name__ == "__main__":
+    test_failed_operation_index()
+    print("✓ Batch errors carry the failing operation's index")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Test that the app serves requests from an in-memory SQLite database"""
+
+import os
+import subprocess
+import sys
+
+# Settings are read at import time, so the app runs in a fresh interpreter
+REQUEST_SCRIPT = """
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_password_hash
+from database import SessionLocal, User
+
+with TestClient(main.app) as client:
+    db = SessionLocal()
+    db.add(User(username="memory", hashed_password=get_password_hash("secret")))
+    db.commit()
+    db.close()
+    response = client.post("/api/login", data={"username": "memory", "password": "secret"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client.post("/api/events/2025-03-01", json={"title": "Memory", "date": "2025-03-01T09:00:00Z"}, headers=headers)
+    assert response.status_code == 200, response.text
+    response = client.get("/api/events?month=2025-03", headers=headers)
+    assert response.status_code == 200, response.text
+    assert "2025-03-01" in response.json(), response.text
+"""
+
+def test_in_memory_sqlite():
+    env = dict(os.environ, DATABASE_URL="sqlite://", NOTIFY_BACKEND="memory")
+    result = subprocess.run(
+        [sys.executable, "-c", REQUEST_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+if __name__ == "__main__":
+    test_in_memory_sqlite()
+    print("✓ In-memory SQLite serves requests")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test that the iCalendar feed's RRULEs produce the same dates as recurrence.expand()"""
+
+import itertools
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+from dateutil.rrule import rruleset, rrulestr
+
+from database import RecurrenceSeries
+from feed import series_vevents
+
+STAMP = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# Month-end anchors are where BYMONTHDAY/BYSETPOS has to match relativedelta's clamping
+ANCHORS = [
+    datetime(2025, 1, 15, 9, 30, tzinfo=timezone.utc),
+    datetime(2025, 1, 29, 9, 30, tzinfo=timezone.utc),
+    datetime(2025, 1, 30, 9, 30, tzinfo=timezone.utc),
+    datetime(2025, 1, 31, 9, 30, tzinfo=timezone.utc),
+    datetime(2024, 2, 29, 18, 0, tzinfo=timezone.utc),
+    datetime(2024, 8, 31, 0, 0, tzinfo=timezone.utc),
+]
+
+TYPE_LISTS = [
+    ["daily"],
+    ["weekly"],
+    ["monthly"],
+    ["quarterly"],
+    ["monthly", "quarterly"],
+    ["quarterly", "monthly"],
+    ["weekly", "daily"],
+    ["daily", "weekly", "monthly", "quarterly"],
+]
+
+def _ends(anchor):
+    """(until, count) pairs: endless, UNTIL only, COUNT only, and both with either one ending first"""
+    return [
+        (None, None),
+        (anchor + timedelta(days=400), None),
+        (None, 14),
+        (anchor + timedelta(days=45), 30),
+        (anchor + timedelta(days=800), 5),
+    ]
+
+def _series(anchor, types, until=None, count=None, exceptions=()):
+    return RecurrenceSeries(
+        series_id="s1",
+        title="Parity",
+        anchor=anchor,
+        recurrence_types=",".join(types),
+        until=until,
+        count=count,
+        exceptions=list(exceptions),
+    )
+
+def _feed_dates(series):
+    """Dates a calendar client expands from the series' VEVENTs, concatenated over all of them"""
+    text = series_vevents(series, STAMP).replace("\r\n ", "")
+    dates = []
+    for component in text.split("BEGIN:VEVENT")[1:]:
+        properties = dict(line.split(":", 1) for line in component.split("\r\n") if ":" in line)
+        ruleset = rruleset()
+        ruleset.rrule(rrulestr(properties["RRULE"], dtstart=parser.parse(properties["DTSTART"])))
+        if "EXDATE" in properties:
+            for value in properties["EXDATE"].split(","):
+                ruleset.exdate(parser.parse(value))
+        dates.extend(ruleset)
+    return sorted(dates)
+
+def _expanded_dates(series):
+    end = None
+    if series.until is None and series.count is None:
+        end = series.anchor + timedelta(days=366)
+    return [occurrence for occurrence, _ in series.occurrences(end=end)]
+
+def _check(series):
+    expected = _expanded_dates(series)
+    actual = _feed_dates(series)
+    if series.until is None and series.count is None:
+        # The feed cuts endless series off after DEFAULT_SPAN; compare within the expanded window
+        actual = [value for value in actual if value < series.anchor + timedelta(days=366)]
+    assert actual == expected, (
+        f"{series.recurrence_types} from {series.anchor} until={series.until} count={series.count} "
+        f"exceptions={series.exceptions}: feed has {len(actual)} dates, expand() {len(expected)}"
+    )
+
+def test_single_and_multi_type_parity():
+    for anchor, types in itertools.product(ANCHORS, TYPE_LISTS):
+        for until, count in _ends(anchor):
+            _check(_series(anchor, types, until, count))
+
+def test_month_end_dates():
+    series = _series(datetime(2025, 1, 31, 9, 30, tzinfo=timezone.utc), ["monthly"], count=4)
+    assert [value.date().isoformat() for value in _feed_dates(series)] == [
+        "2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30",
+    ]
+
+def test_exceptions_parity():
+    anchor = datetime(2025, 1, 31, 9, 30, tzinfo=timezone.utc)
+    # A date shared by several types, a clamped month-end date, and one no rule produces
+    exceptions = ["2025-02-28", "2025-04-30", "2025-03-01"]
+    for types in TYPE_LISTS:
+        for until, count in _ends(anchor):
+            _check(_series(anchor, types, until, count, exceptions))
+
+def test_shared_dates_listed_once():
+    series = _series(datetime(2025, 1, 31, 9, 30, tzinfo=timezone.utc), ["daily", "monthly"], count=40)
+    dates = _feed_dates(series)
+    assert len(dates) == len(set(dates))
+
+if __name__ == "__main__":
+    test_single_and_multi_type_parity()
+    test_month_end_dates()
+    test_exceptions_parity()
+    test_shared_dates_listed_once()
+    print("✓ Feed RRULEs match recurrence.expand()")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test recurrence expansion: month-end clamping, multi-type dedupe and exceptions"""
+
+from datetime import datetime, timedelta, timezone
+
+from recurrence import count_occurrences, expand
+
+ANCHOR = datetime(2025, 1, 31, 9, 30, tzinfo=timezone.utc)
+
+def _days(occurrences):
+    return [(occurrence.date().isoformat(), recurrence_type) for occurrence, recurrence_type in occurrences]
+
+def test_month_end_clamping():
+    # Short months fall back to their last day without drifting the later ones
+    assert _days(expand(ANCHOR, ["monthly"], count=5)) == [
+        ("2025-01-31", "monthly"),
+        ("2025-02-28", "monthly"),
+        ("2025-03-31", "monthly"),
+        ("2025-04-30", "monthly"),
+        ("2025-05-31", "monthly"),
+    ]
+    leap = datetime(2024, 1, 31, tzinfo=timezone.utc)
+    assert [day for day, _ in _days(expand(leap, ["monthly"], count=2))] == ["2024-01-31", "2024-02-29"]
+    assert [day for day, _ in _days(expand(ANCHOR, ["quarterly"], count=4))] == [
+        "2025-01-31", "2025-04-30", "2025-07-31", "2025-10-31",
+    ]
+
+def test_multi_type_dedupe():
+    # Dates produced by several types are reported once, for the first type listed
+    occurrences = _days(expand(ANCHOR, ["quarterly", "monthly"], count=4))
+    assert occurrences == [
+        ("2025-01-31", "quarterly"),
+        ("2025-02-28", "monthly"),
+        ("2025-03-31", "monthly"),
+        ("2025-04-30", "quarterly"),
+        ("2025-07-31", "quarterly"),
+        ("2025-10-31", "quarterly"),
+    ]
+    daily_first = _days(expand(ANCHOR, ["daily", "weekly"], end=ANCHOR + timedelta(days=14)))
+    assert len(daily_first) == 14
+    assert {recurrence_type for _, recurrence_type in daily_first} == {"daily"}
+
+def test_exceptions():
+    occurrences = _days(expand(ANCHOR, ["monthly", "weekly"], count=3, exceptions=["2025-02-28", "2025-02-07"]))
+    assert occurrences == [
+        ("2025-01-31", "monthly"),
+        ("2025-02-14", "weekly"),
+        ("2025-03-31", "monthly"),
+    ]
+
+def test_window():
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    end = datetime(2025, 5, 1, tzinfo=timezone.utc)
+    assert _days(expand(ANCHOR, ["monthly"], start=start, end=end)) == [
+        ("2025-03-31", "monthly"),
+        ("2025-04-30", "monthly"),
+    ]
+    # until is inclusive
+    until = datetime(2025, 3, 31, 9, 30, tzinfo=timezone.utc)
+    assert [day for day, _ in _days(expand(ANCHOR, ["monthly"], until=until))] == [
+        "2025-01-31", "2025-02-28", "2025-03-31",
+    ]
+
+def test_count_occurrences_matches_expand():
+    for types in (["daily"], ["weekly"], ["monthly"], ["quarterly"], ["monthly", "quarterly"], ["weekly", "daily"]):
+        for until, count in ((ANCHOR + timedelta(days=400), None), (None, 7), (ANCHOR + timedelta(days=60), 30)):
+            expected = sum(1 for _ in expand(ANCHOR, types, until=until, count=count))
+            assert count_occurrences(ANCHOR, types, until=until, count=count) == expected, (types, until, count)
+
+if __name__ == "__main__":
+    test_month_end_clamping()
+    test_multi_type_dedupe()
+    test_exceptions()
+    test_window()
+    test_count_occurrences_matches_expand()
+    print("✓ Recurrence expansion tests passed")